@@ -4,13 +4,52 @@ ADB Connection Manager for Fire TV Monitoring
 Handles ADB connections, device management, and command execution
 """
 
+import asyncio
+import os
 import subprocess
 import logging
+import queue
+import threading
 import time
 import re
-from typing import Optional, List, Dict, Any
+import selectors
+import shutil
+import socket
+import uuid
+from typing import Optional, List, Dict, Any, Union, Tuple, Callable
 from dataclasses import dataclass
 
+# Absolute adb path: together with close_fds=False it lets subprocess use
+# posix_spawn instead of fork, which copies this process's page tables
+ADB_BINARY = shutil.which("adb") or "adb"
+
+# Properties read by get_device_info, in the order they are unpacked
+DEVICE_INFO_PROPS = ("ro.product.model", "ro.build.version.release", "ro.build.version.sdk")
+
+# `dumpsys meminfo` rows: summary total and private dirty column of the heaps
+_RE_MEMINFO_TOTAL = re.compile(rb"^\s*TOTAL(?: PSS)?:\s+(\d+)", re.MULTILINE)
+_RE_MEMINFO_NATIVE = re.compile(rb"^\s*Native Heap\s+\d+\s+(\d+)", re.MULTILINE)
+_RE_MEMINFO_DALVIK = re.compile(rb"^\s*Dalvik Heap\s+\d+\s+(\d+)", re.MULTILINE)
+
+# toybox ps (Android 8+) only lists the shell's own session unless given -A,
+# while older toolbox ps treats -A as a process name filter
+_PS_ALL_MIN_API = 26
+
+# The am and input wrappers are shell scripts around these `cmd` services
+# from these API levels, so calling the service directly skips a sh fork
+_CMD_ACTIVITY_MIN_API = 26
+_CMD_INPUT_MIN_API = 31
+
+# `--compressed` roughly halves the XML but drops layout nodes that aren't
+# important for accessibility, including containers the state checks look
+# for by resource-id, so it is opt-in; builds without the flag fail and
+# get the full dump instead
+_UI_DUMP_COMPRESSED = "uiautomator dump --compressed /dev/stdout"
+_UI_DUMP = "uiautomator dump /dev/stdout"
+
+# mCurrentFocus=Window{<hash> u0 <package>/<activity>}
+_RE_FOCUS = re.compile(r'mCurrentFocus=[^{]*\{[^}]*?\s(\S+)/([^\s}]+)')
+
 @dataclass
 class DeviceInfo:
     """Information about a connected device"""
@@ -20,9 +59,216 @@ class DeviceInfo:
     android_version: Optional[str] = None
     api_level: Optional[int] = None
 
+def _parse_devices(output: str) -> List[DeviceInfo]:
+    """Parse `adb devices` output"""
+    devices = []
+    # The CLI prints a header and daemon notices, the server protocol
+    # sends bare rows; only rows contain a tab
+    for line in output.strip().split('\n'):
+        if line.strip():
+            parts = line.split('\t')
+            if len(parts) >= 2:
+                devices.append(DeviceInfo(
+                    device_id=parts[0],
+                    state=parts[1]
+                ))
+    
+    return devices
+
+def _parse_device_info(device_id: str, output: Optional[str]) -> DeviceInfo:
+    """Parse batched getprop output, one value per line"""
+    values = [value.strip() for value in (output or "").split("\n")]
+    values += [""] * (len(DEVICE_INFO_PROPS) - len(values))
+    model, android_version, api_level = values[:len(DEVICE_INFO_PROPS)]
+    
+    return DeviceInfo(
+        device_id=device_id,
+        state="device",
+        model=model or None,
+        android_version=android_version or None,
+        api_level=int(api_level) if api_level.isdigit() else None
+    )
+
+def _parse_memory_usage(output: bytes) -> Optional[Dict[str, Any]]:
+    """Parse raw `dumpsys meminfo` output without decoding it"""
+    # Heap rows live in the per-category table, the total in "App Summary"
+    summary_idx = output.find(b"App Summary")
+    if summary_idx >= 0:
+        table, summary = output[:summary_idx], output[summary_idx:]
+    else:
+        table = summary = output
+    
+    memory_info = {}
+    for key, pattern, text in (
+        ("total_pss_kb", _RE_MEMINFO_TOTAL, summary),
+        ("native_heap_kb", _RE_MEMINFO_NATIVE, table),
+        ("dalvik_heap_kb", _RE_MEMINFO_DALVIK, table)
+    ):
+        match = pattern.search(text)
+        if match:
+            memory_info[key] = int(match.group(1))
+    
+    return memory_info if memory_info else None
+
+@dataclass
+class HealthSnapshot:
+    """App state gathered by ADBManager.health_snapshot in one round-trip"""
+    app_running: bool
+    current_activity: Optional[str]
+    memory_info: Optional[Dict[str, Any]]
+    ui_dump: Optional[str]
+
+def _health_script(ps: str, app_package: str, ui_dump: str, marker: str) -> str:
+    """Shell script running each health probe with a marker line after it"""
+    probes = (ps, "dumpsys window windows | grep mCurrentFocus",
+              f"dumpsys meminfo {app_package}", ui_dump)
+    return "; ".join(f"{probe}; echo {marker}" for probe in probes)
+
+def _parse_health_snapshot(output: bytes, marker: str, app_package: str) -> Optional[HealthSnapshot]:
+    """Split _health_script output into its probes and parse each one"""
+    sections = output.split(marker.encode() + b"\n")
+    if len(sections) < 5:
+        return None
+    ps, focus, meminfo, ui_dump = sections[:4]
+    
+    activity = focus.decode("utf-8", errors="replace")
+    ui_dump = ui_dump.decode("utf-8", errors="replace")
+    return HealthSnapshot(
+        app_running=app_package.encode() in ps,
+        current_activity=_parse_current_activity(activity) if activity else None,
+        memory_info=_parse_memory_usage(meminfo) if meminfo else None,
+        ui_dump=ui_dump if ui_dump.strip() else None
+    )
+
+def _parse_current_activity(output: str) -> Optional[str]:
+    """Extract activity name from `dumpsys window` focus info"""
+    focus_line = next((line for line in output.splitlines() if "mCurrentFocus" in line), "")
+    match = _RE_FOCUS.search(focus_line)
+    if match:
+        return f"{match.group(1)}/{match.group(2)}"
+    return None
+
+def _framed_command(command: str, marker: str) -> str:
+    """Script running command in a persistent shell, then a marker line
+    
+    The marker line carries the exit status and, if the command failed,
+    its stderr flattened to one line. Raw sessions share one stream for
+    stdout and stderr, so stderr is held back rather than interleaved.
+    """
+    # Grouped so the command's stdin can't swallow the following input
+    return (f"{{ __err=$({{ {command}\n}} </dev/null 2>&1 1>&3 3>&-); __rc=$?; }} 3>&1\n"
+            f"if [ $__rc -eq 0 ]; then echo {marker}0; "
+            f"else printf '{marker}%s %s\\n' $__rc \"$(printf %s \"$__err\" | tr '\\n' ' ')\"; fi\n")
+
+class AdbServerClient:
+    """Minimal client for the local adb server's smart socket protocol"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 5037, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+    
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        """Read exactly size bytes or raise if the server hangs up"""
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("adb server closed the connection")
+            data += chunk
+        return data
+    
+    def _read_payload(self, sock: socket.socket) -> bytes:
+        """Read a 4 hex digit length-prefixed payload"""
+        length = int(self._recv_exact(sock, 4), 16)
+        return self._recv_exact(sock, length)
+    
+    def _request(self, sock: socket.socket, service: str):
+        """Send a service request and wait for OKAY"""
+        payload = service.encode()
+        sock.sendall(b"%04x" % len(payload) + payload)
+        status = self._recv_exact(sock, 4)
+        if status == b"FAIL":
+            message = self._read_payload(sock).decode(errors="replace")
+            raise ConnectionError(f"adb server refused {service}: {message}")
+        if status != b"OKAY":
+            raise ConnectionError(f"Unexpected adb server reply to {service}: {status!r}")
+    
+    def devices(self) -> str:
+        """Return the `host:devices` listing, one `serial\tstate` row per line"""
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            self._request(sock, "host:devices")
+            return self._read_payload(sock).decode(errors="replace")
+    
+    def open_service(self, serial: str, service: str) -> socket.socket:
+        """Switch a new connection to the device and start a service on it
+        
+        The server hands the socket over to the device after
+        `host:transport`, so each connection carries exactly one service.
+        """
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        try:
+            self._request(sock, f"host:transport:{serial}")
+            self._request(sock, service)
+        except BaseException:
+            sock.close()
+            raise
+        sock.settimeout(None)
+        return sock
+
+class _ShellSession:
+    """A long-lived device shell fed commands on stdin"""
+    
+    def __init__(self, stdin, stdout, close: Callable[[], None]):
+        self.stdin = stdin
+        self.output: queue.Queue = queue.Queue()
+        self._close = close
+        self._reader = threading.Thread(target=self._read, args=(stdout,), daemon=True)
+        self._reader.start()
+    
+    def _read(self, stream):
+        """Forward output lines to the queue, None marks EOF"""
+        try:
+            for line in iter(stream.readline, b""):
+                self.output.put(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.output.put(None)
+    
+    @property
+    def alive(self) -> bool:
+        return self._reader.is_alive()
+    
+    def close(self):
+        self._close()
+
 class ADBManager:
     """Manages ADB connections and commands for Fire TV monitoring"""
     
+    # Last `adb devices` result keyed by device id, shared by all instances
+    # since they talk to the same adb server: (taken_at, devices)
+    _devices_snapshot: Tuple[float, Dict[str, DeviceInfo]] = (0.0, {})
+    
+    # Shared managers per device, see get_instance
+    _INSTANCES: Dict[Tuple[str, int], "ADBManager"] = {}
+    _INSTANCES_LOCK = threading.Lock()
+    
+    @classmethod
+    def get_instance(cls, device_ip: str = "192.168.4.94", device_port: int = 5555) -> "ADBManager":
+        """Return the manager shared by all callers for this device
+        
+        Sharing one instance means one shell session and one set of
+        connection and device caches per device instead of one per caller.
+        """
+        key = (device_ip, device_port)
+        with cls._INSTANCES_LOCK:
+            instance = cls._INSTANCES.get(key)
+            if instance is None:
+                instance = cls._INSTANCES[key] = cls(device_ip, device_port)
+            return instance
+    
     def __init__(self, device_ip: str = "192.168.4.94", device_port: int = 5555):
         self.device_ip = device_ip
         self.device_port = device_port
@@ -31,16 +277,41 @@ class ADBManager:
         self.app_activity = "com.webviewer.firetv.MainActivity"
         self.logger = logging.getLogger(__name__)
         
+        # Persistent shell session shared by all execute_command calls,
+        # opened straight through the adb server when it is reachable
+        self._server = AdbServerClient()
+        self._shell: Optional[_ShellSession] = None
+        self._shell_lock = threading.Lock()
+        
+        # is_connected() trusts a recent successful round-trip for this long
+        self._conn_cache_ts = 0.0
+        self._conn_cache_ttl = 5.0
+        
+        # Device properties and installed state rarely change within a session
+        self._device_info: Optional[DeviceInfo] = None
+        self._installed = False
+        self._installed_checked_at = 0.0
+        self._installed_cache_ttl = 30.0
+        
+        # Opt-in compressed UI dumps, and whether uiautomator accepts
+        # --compressed, None until known
+        self.compressed_ui_dump = False
+        self._dump_compressed: Optional[bool] = None
+        
     def connect(self) -> bool:
         """Connect to the Fire TV device"""
         try:
             result = subprocess.run(
-                ["adb", "connect", self.device_id],
+                [ADB_BINARY, "connect", self.device_id],
                 capture_output=True,
+                close_fds=False,
                 text=True,
                 timeout=10
             )
             
+            # The device list changes on (re)connection
+            ADBManager._devices_snapshot = (0.0, {})
+            
             if result.returncode == 0:
                 if "connected" in result.stdout.lower():
                     self.logger.info(f"Successfully connected to {self.device_id}")
@@ -62,12 +333,17 @@ class ADBManager:
     def disconnect(self) -> bool:
         """Disconnect from the Fire TV device"""
         try:
+            with self._shell_lock:
+                self._close_shell()
+            
             result = subprocess.run(
-                ["adb", "disconnect", self.device_id],
+                [ADB_BINARY, "disconnect", self.device_id],
                 capture_output=True,
+                close_fds=False,
                 text=True,
                 timeout=5
             )
+            ADBManager._devices_snapshot = (0.0, {})
             self.logger.info(f"Disconnected from {self.device_id}")
             return result.returncode == 0
         except Exception as e:
@@ -76,11 +352,19 @@ class ADBManager:
     
     def is_connected(self) -> bool:
         """Check if device is connected and responsive"""
+        if time.monotonic() - self._conn_cache_ts < self._conn_cache_ttl:
+            return True
+        
         try:
-            devices = self.get_connected_devices()
-            for device in devices:
-                if device.device_id == self.device_id and device.state == "device":
-                    return True
+            taken_at, devices = ADBManager._devices_snapshot
+            if time.monotonic() - taken_at >= self._conn_cache_ttl:
+                self.get_connected_devices()
+                _, devices = ADBManager._devices_snapshot
+            
+            device = devices.get(self.device_id)
+            if device is not None and device.state == "device":
+                self._conn_cache_ts = time.monotonic()
+                return True
             return False
         except Exception:
             return False
@@ -88,97 +372,241 @@ class ADBManager:
     def get_connected_devices(self) -> List[DeviceInfo]:
         """Get list of connected devices"""
         try:
-            result = subprocess.run(
-                ["adb", "devices"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            devices = []
-            lines = result.stdout.strip().split('\n')[1:]  # Skip header
-            
-            for line in lines:
-                if line.strip():
-                    parts = line.split('\t')
-                    if len(parts) >= 2:
-                        devices.append(DeviceInfo(
-                            device_id=parts[0],
-                            state=parts[1]
-                        ))
+            try:
+                output = self._server.devices()
+            except OSError as e:
+                # The CLI also starts the server if it is not running yet
+                self.logger.debug(f"adb server unavailable ({e}), using adb devices")
+                output = subprocess.run(
+                    [ADB_BINARY, "devices"],
+                    capture_output=True,
+                    close_fds=False,
+                    text=True,
+                    timeout=5
+                ).stdout
             
+            devices = _parse_devices(output)
+            ADBManager._devices_snapshot = (
+                time.monotonic(),
+                {device.device_id: device for device in devices}
+            )
             return devices
             
         except Exception as e:
+            ADBManager._devices_snapshot = (0.0, {})
             self.logger.error(f"Error getting devices: {e}")
             return []
     
-    def execute_command(self, command: str, timeout: int = 30) -> Optional[str]:
-        """Execute ADB shell command"""
+    def _ensure_shell(self) -> _ShellSession:
+        """Start the persistent shell session if it is not running"""
+        if self._shell is None or not self._shell.alive:
+            self._close_shell()
+            self._shell = self._open_shell()
+        return self._shell
+    
+    def _open_shell(self) -> _ShellSession:
+        """Open a raw `sh` through the adb server, falling back to the adb CLI"""
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return None
+            sock = self._server.open_service(self.device_id, "exec:sh")
+        except OSError as e:
+            self.logger.debug(f"adb server unavailable ({e}), using adb shell")
+        else:
+            def close_socket():
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
             
-            cmd = ["adb", "-s", self.device_id, "shell", command]
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
+            return _ShellSession(sock.makefile("wb"), sock.makefile("rb"), close_socket)
+        
+        proc = subprocess.Popen(
+            [ADB_BINARY, "-s", self.device_id, "shell"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            close_fds=False
+        )
+        
+        def close_proc():
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait(timeout=5)
+        
+        return _ShellSession(proc.stdin, proc.stdout, close_proc)
+    
+    def _close_shell(self):
+        """Terminate the persistent shell session"""
+        self._conn_cache_ts = 0.0
+        shell, self._shell = self._shell, None
+        if shell is None:
+            return
+        try:
+            shell.close()
+        except Exception as e:
+            self.logger.debug(f"Error closing shell session: {e}")
+    
+    def _run_in_shell(self, command: str, timeout: float,
+                      log_failure: bool = True) -> Optional[bytes]:
+        """Run a command in the persistent shell and wait for its end marker"""
+        shell = self._ensure_shell()
+        marker = f"__END_{uuid.uuid4().hex}__:".encode()
+        
+        try:
+            shell.stdin.write(_framed_command(command, marker.decode()).encode())
+            shell.stdin.flush()
+        except OSError as e:
+            self.logger.error(f"Shell session write failed: {e}")
+            self._close_shell()
+            return None
+        
+        output = []
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = shell.output.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                self.logger.error(f"Command timeout: {command}")
+                self._close_shell()
+                return None
             
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                self.logger.error(f"Command failed: {command}, Error: {result.stderr}")
+            if line is None:
+                self.logger.error(f"Shell session closed during command: {command}")
+                self._close_shell()
                 return None
+            
+            idx = line.find(marker)
+            if idx < 0:
+                output.append(line)
+                continue
+            
+            output.append(line[:idx])
+            exit_status, _, error = line[idx + len(marker):].decode(errors="replace").partition(" ")
+            break
+        
+        # The session answered, so the device is reachable regardless of status
+        self._conn_cache_ts = time.monotonic()
+        
+        exit_status = exit_status.strip()
+        if exit_status == "0":
+            return b"".join(output)
+        
+        if log_failure:
+            self.logger.error(f"Command failed: {command}, exit status: {exit_status}, "
+                              f"Error: {error.strip()}")
+        return None
+    
+    def _execute_raw(self, command: str, timeout: int = 30,
+                     log_failure: bool = True) -> Optional[bytes]:
+        """Execute ADB shell command and return its undecoded output"""
+        try:
+            # A recent round-trip vouches for the link without the call; shell
+            # failures reset the memo so the next command re-checks
+            if (time.monotonic() - self._conn_cache_ts >= self._conn_cache_ttl
+                    and not self.is_connected()):
+                if not self.connect():
+                    return None
+            
+            with self._shell_lock:
+                return self._run_in_shell(command, timeout, log_failure)
                 
-        except subprocess.TimeoutExpired:
-            self.logger.error(f"Command timeout: {command}")
-            return None
         except Exception as e:
             self.logger.error(f"Command execution error: {e}")
             return None
     
+    def execute_command(self, command: str, timeout: int = 30) -> Optional[str]:
+        """Execute ADB shell command"""
+        result = self._execute_raw(command, timeout)
+        return result.decode("utf-8", errors="replace") if result is not None else None
+    
+    def execute_script(self, commands: List[str], sleeps: Optional[List[float]] = None,
+                       timeout: int = 30) -> Optional[str]:
+        """Execute several shell commands in a single round-trip
+        
+        sleeps[i] is an on-device delay inserted after commands[i].
+        """
+        sleeps = sleeps or []
+        parts = []
+        for i, command in enumerate(commands):
+            parts.append(command)
+            if i < len(sleeps) and sleeps[i] > 0:
+                parts.append(f"sleep {sleeps[i]:g}")
+        return self.execute_command("; ".join(parts), timeout + sum(sleeps))
+    
     def get_device_info(self) -> Optional[DeviceInfo]:
         """Get detailed device information"""
+        if self._device_info is not None:
+            return self._device_info
+        
         try:
-            model = self.execute_command("getprop ro.product.model")
-            android_version = self.execute_command("getprop ro.build.version.release")
-            api_level = self.execute_command("getprop ro.build.version.sdk")
-            
-            return DeviceInfo(
-                device_id=self.device_id,
-                state="device",
-                model=model.strip() if model else None,
-                android_version=android_version.strip() if android_version else None,
-                api_level=int(api_level.strip()) if api_level and api_level.strip().isdigit() else None
+            # All properties in one round-trip, one value per output line
+            result = self.execute_command(
+                "; ".join(f"getprop {prop}" for prop in DEVICE_INFO_PROPS)
             )
+            device_info = _parse_device_info(self.device_id, result)
+            if device_info.api_level is not None:
+                self._device_info = device_info
+            return device_info
         except Exception as e:
             self.logger.error(f"Error getting device info: {e}")
             return None
     
+    def _api_level(self) -> int:
+        """Device API level, 0 if it could not be determined"""
+        device_info = self.get_device_info()
+        return (device_info.api_level or 0) if device_info else 0
+    
+    def _am(self) -> str:
+        """Activity manager command for this device"""
+        return "cmd activity" if self._api_level() >= _CMD_ACTIVITY_MIN_API else "am"
+    
+    def am_command(self, args: str) -> str:
+        """Activity manager command line for args, for callers building scripts"""
+        return f"{self._am()} {args}"
+    
+    def _input(self) -> str:
+        """Input command for this device"""
+        return "cmd input" if self._api_level() >= _CMD_INPUT_MIN_API else "input"
+    
     def is_app_installed(self) -> bool:
         """Check if the Fire TV app is installed"""
+        if time.monotonic() - self._installed_checked_at < self._installed_cache_ttl:
+            return self._installed
+        
         try:
-            result = self.execute_command(f"pm list packages | grep {self.app_package}")
-            return result is not None and self.app_package in result
+            result = self.execute_command("pm list packages")
+            if result is None:
+                return False
+            
+            self._installed = f"package:{self.app_package}" in result.split()
+            self._installed_checked_at = time.monotonic()
+            return self._installed
         except Exception:
             return False
     
     def is_app_running(self) -> bool:
         """Check if the app is currently running"""
         try:
-            result = self.execute_command(f"ps | grep {self.app_package}")
+            ps = "ps -A" if self._api_level() >= _PS_ALL_MIN_API else "ps"
+            result = self.execute_command(ps)
             return result is not None and self.app_package in result
         except Exception:
             return False
     
+    def wait_until_running(self, timeout: float = 10.0, interval: float = 0.25) -> bool:
+        """Poll until the app process is up, False if it isn't within timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.is_app_running():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+    
     def start_app(self) -> bool:
         """Start the Fire TV app"""
         try:
-            cmd = f"am start -n {self.app_package}/{self.app_activity}"
+            cmd = f"{self._am()} start -n {self.app_package}/{self.app_activity}"
             result = self.execute_command(cmd)
             return result is not None and "Starting" in result
         except Exception as e:
@@ -188,7 +616,7 @@ class ADBManager:
     def force_stop_app(self) -> bool:
         """Force stop the app"""
         try:
-            result = self.execute_command(f"am force-stop {self.app_package}")
+            result = self.execute_command(f"{self._am()} force-stop {self.app_package}")
             return result is not None
         except Exception as e:
             self.logger.error(f"Error force stopping app: {e}")
@@ -206,37 +634,12 @@ class ADBManager:
     def get_app_memory_usage(self) -> Optional[Dict[str, Any]]:
         """Get app memory usage information"""
         try:
-            result = self.execute_command(f"dumpsys meminfo {self.app_package}")
+            # Parsed as bytes, the multi-KB dump is never decoded
+            result = self._execute_raw(f"dumpsys meminfo {self.app_package}")
             if not result:
                 return None
             
-            memory_info = {}
-            lines = result.split('\n')
-            
-            for line in lines:
-                if "TOTAL" in line and "PSS" in line:
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        try:
-                            memory_info["total_pss_kb"] = int(parts[1])
-                        except ValueError:
-                            pass
-                elif "Native Heap" in line:
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        try:
-                            memory_info["native_heap_kb"] = int(parts[3])
-                        except ValueError:
-                            pass
-                elif "Dalvik Heap" in line:
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        try:
-                            memory_info["dalvik_heap_kb"] = int(parts[3])
-                        except ValueError:
-                            pass
-            
-            return memory_info if memory_info else None
+            return _parse_memory_usage(result)
             
         except Exception as e:
             self.logger.error(f"Error getting memory usage: {e}")
@@ -245,16 +648,35 @@ class ADBManager:
     def send_key_event(self, key_code: int) -> bool:
         """Send key event to device"""
         try:
-            result = self.execute_command(f"input keyevent {key_code}")
+            result = self.execute_command(f"{self._input()} keyevent {key_code}")
             return result is not None
         except Exception as e:
             self.logger.error(f"Error sending key event {key_code}: {e}")
             return False
     
+    def send_key_events(self, key_codes: List[int], delay: Union[float, List[float]] = 0.5) -> bool:
+        """Send a sequence of key events in one round-trip
+        
+        delay is either a uniform pause between events or a list of
+        pauses applied after each event, both slept on-device.
+        """
+        try:
+            if isinstance(delay, list):
+                sleeps = delay
+            else:
+                sleeps = [delay] * (len(key_codes) - 1)
+            input_cmd = self._input()
+            commands = [f"{input_cmd} keyevent {key_code}" for key_code in key_codes]
+            result = self.execute_script(commands, sleeps)
+            return result is not None
+        except Exception as e:
+            self.logger.error(f"Error sending key events {key_codes}: {e}")
+            return False
+    
     def send_tap(self, x: int, y: int) -> bool:
         """Send tap event to device"""
         try:
-            result = self.execute_command(f"input tap {x} {y}")
+            result = self.execute_command(f"{self._input()} tap {x} {y}")
             return result is not None
         except Exception as e:
             self.logger.error(f"Error sending tap {x},{y}: {e}")
@@ -263,7 +685,23 @@ class ADBManager:
     def get_screen_dump(self) -> Optional[str]:
         """Get UI hierarchy dump"""
         try:
-            return self.execute_command("uiautomator dump /dev/stdout")
+            if self.compressed_ui_dump and self._dump_compressed is not False:
+                # The first try doubles as the probe, and builds without the
+                # flag failing it is expected rather than an error
+                result = self._execute_raw(_UI_DUMP_COMPRESSED,
+                                           log_failure=self._dump_compressed is not None)
+                if result is not None:
+                    self._dump_compressed = True
+                    return result.decode("utf-8", errors="replace")
+                if self._dump_compressed:
+                    return None
+            
+            result = self.execute_command(_UI_DUMP)
+            if result is not None and self.compressed_ui_dump and self._dump_compressed is None:
+                # Only the flag can explain a failure the plain dump avoids
+                self.logger.info("uiautomator doesn't support --compressed, using full dumps")
+                self._dump_compressed = False
+            return result
         except Exception as e:
             self.logger.error(f"Error getting screen dump: {e}")
             return None
@@ -272,26 +710,74 @@ class ADBManager:
         """Get current activity name"""
         try:
             result = self.execute_command("dumpsys window windows | grep mCurrentFocus")
-            if result:
-                # Extract activity name from focus info
-                match = re.search(r'mCurrentFocus=.*\{.*\s(.+)/(.+)\s', result)
-                if match:
-                    return f"{match.group(1)}/{match.group(2)}"
-            return None
+            return _parse_current_activity(result) if result else None
         except Exception as e:
             self.logger.error(f"Error getting current activity: {e}")
             return None
     
+    def health_snapshot(self) -> Optional[HealthSnapshot]:
+        """Run all health check probes in a single shell round-trip
+        
+        Covers is_app_running, get_current_activity, get_app_memory_usage
+        and get_screen_dump. Returns None if the round-trip fails.
+        """
+        try:
+            if self.compressed_ui_dump and self._dump_compressed is None:
+                # Settle whether --compressed works before scripting the dump
+                self.get_screen_dump()
+            ui_dump = (_UI_DUMP_COMPRESSED if self.compressed_ui_dump and self._dump_compressed
+                       else _UI_DUMP)
+            ps = "ps -A" if self._api_level() >= _PS_ALL_MIN_API else "ps"
+            marker = f"__PROBE_{uuid.uuid4().hex}__"
+            
+            result = self._execute_raw(_health_script(ps, self.app_package, ui_dump, marker))
+            return _parse_health_snapshot(result, marker, self.app_package) if result else None
+        except Exception as e:
+            self.logger.error(f"Error taking health snapshot: {e}")
+            return None
+    
+    def _popen_with_timeout(self, argv: List[str], timeout: float) -> Tuple[int, bytes, bytes]:
+        """Run a command draining stdout and stderr together until exit
+        
+        Raises subprocess.TimeoutExpired after killing the process if it
+        doesn't finish within timeout.
+        """
+        proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, close_fds=False,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output = {proc.stdout: [], proc.stderr: []}
+        deadline = time.monotonic() + timeout
+        
+        with proc, selectors.DefaultSelector() as selector:
+            for stream in output:
+                selector.register(stream, selectors.EVENT_READ)
+            
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    proc.kill()
+                    raise subprocess.TimeoutExpired(argv, timeout)
+                for key, _ in selector.select(remaining):
+                    chunk = os.read(key.fd, 65536)
+                    if chunk:
+                        output[key.fileobj].append(chunk)
+                    else:
+                        selector.unregister(key.fileobj)
+            
+            try:
+                returncode = proc.wait(timeout=max(deadline - time.monotonic(), 0.1))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                raise
+        
+        return returncode, b"".join(output[proc.stdout]), b"".join(output[proc.stderr])
+    
     def install_apk(self, apk_path: str) -> bool:
         """Install APK on device"""
         try:
-            result = subprocess.run(
-                ["adb", "-s", self.device_id, "install", "-r", apk_path],
-                capture_output=True,
-                text=True,
-                timeout=60
+            returncode, stdout, _ = self._popen_with_timeout(
+                [ADB_BINARY, "-s", self.device_id, "install", "-r", apk_path], 60
             )
-            return result.returncode == 0 and "Success" in result.stdout
+            return returncode == 0 and b"Success" in stdout
         except Exception as e:
             self.logger.error(f"Error installing APK: {e}")
             return False
@@ -302,4 +788,300 @@ class ADBManager:
             return True
         
         self.logger.warning("Device not connected, attempting reconnection...")
-        return self.connect()
\ No newline at end of file
+        return self.connect()
+
+class AsyncADBManager:
+    """asyncio counterpart of ADBManager for callers running in an event loop
+    
+    Shell commands go through one persistent `adb shell` session and
+    take turns on it; host-side calls such as connect and install are
+    separate asyncio subprocesses. Either way nothing occupies a thread.
+    """
+    
+    def __init__(self, device_ip: str = "192.168.4.94", device_port: int = 5555):
+        self.device_ip = device_ip
+        self.device_port = device_port
+        self.device_id = f"{device_ip}:{device_port}"
+        self.app_package = "com.webviewer.firetv"
+        self.app_activity = "com.webviewer.firetv.MainActivity"
+        self.logger = logging.getLogger(__name__)
+        self._device_info: Optional[DeviceInfo] = None
+        self.compressed_ui_dump = False
+        self._dump_compressed: Optional[bool] = None
+        
+        # Persistent `adb shell` fed commands on stdin, like ADBManager's
+        # session; the lock is made on first use so it binds the running loop
+        self._shell: Optional[asyncio.subprocess.Process] = None
+        self._shell_lock: Optional[asyncio.Lock] = None
+    
+    async def _run(self, argv: List[str], timeout: float) -> Tuple[int, bytes, bytes]:
+        """Run an adb invocation and return (returncode, stdout, stderr)"""
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            close_fds=False
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        
+        return proc.returncode, stdout, stderr
+    
+    async def connect(self) -> bool:
+        """Connect to the Fire TV device"""
+        try:
+            returncode, stdout, stderr = await self._run([ADB_BINARY, "connect", self.device_id], 10)
+            
+            if returncode == 0 and b"connected" in stdout.lower():
+                self.logger.info(f"Successfully connected to {self.device_id}")
+                return True
+            
+            self.logger.error(f"Failed to connect to {self.device_id}: {stderr.decode(errors='replace')}")
+            return False
+            
+        except asyncio.TimeoutError:
+            self.logger.error(f"Connection timeout to {self.device_id}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Connection error: {e}")
+            return False
+    
+    async def disconnect(self) -> bool:
+        """Disconnect from the Fire TV device"""
+        try:
+            await self._close_shell()
+            returncode, _, _ = await self._run([ADB_BINARY, "disconnect", self.device_id], 5)
+            self.logger.info(f"Disconnected from {self.device_id}")
+            return returncode == 0
+        except Exception as e:
+            self.logger.error(f"Disconnect error: {e}")
+            return False
+    
+    async def get_connected_devices(self) -> List[DeviceInfo]:
+        """Get list of connected devices"""
+        try:
+            _, stdout, _ = await self._run([ADB_BINARY, "devices"], 5)
+            return _parse_devices(stdout.decode(errors="replace"))
+        except Exception as e:
+            self.logger.error(f"Error getting devices: {e}")
+            return []
+    
+    async def is_connected(self) -> bool:
+        """Check if device is connected and responsive"""
+        devices = await self.get_connected_devices()
+        return any(device.device_id == self.device_id and device.state == "device"
+                   for device in devices)
+    
+    async def ensure_connection(self) -> bool:
+        """Ensure device is connected, reconnect if necessary"""
+        if await self.is_connected():
+            return True
+        
+        self.logger.warning("Device not connected, attempting reconnection...")
+        return await self.connect()
+    
+    async def _open_shell(self) -> asyncio.subprocess.Process:
+        """Start the persistent shell if it isn't running"""
+        if self._shell is None or self._shell.returncode is not None:
+            self._shell = await asyncio.create_subprocess_exec(
+                ADB_BINARY, "-s", self.device_id, "shell",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                close_fds=False
+            )
+        return self._shell
+    
+    async def _close_shell(self):
+        """Ask the persistent shell to exit, killing it if it doesn't"""
+        shell, self._shell = self._shell, None
+        if shell is None or shell.returncode is not None:
+            return
+        
+        try:
+            shell.stdin.write(b"exit\n")
+            await shell.stdin.drain()
+            await asyncio.wait_for(shell.wait(), 2)
+        except Exception:
+            shell.kill()
+            await shell.wait()
+    
+    def _kill_shell(self):
+        """Drop a persistent shell left mid-command"""
+        shell, self._shell = self._shell, None
+        if shell is not None and shell.returncode is None:
+            shell.kill()
+            # Reaped in the background so its pipes close with the loop open
+            asyncio.ensure_future(shell.wait())
+    
+    async def _run_in_shell(self, command: str, timeout: float,
+                            log_failure: bool = True) -> Optional[bytes]:
+        """Run a command in the persistent shell and wait for its end marker"""
+        shell = await self._open_shell()
+        marker = f"__END_{uuid.uuid4().hex}__:".encode()
+        
+        shell.stdin.write(_framed_command(command, marker.decode()).encode())
+        await shell.stdin.drain()
+        
+        # Read in chunks rather than lines: a compressed UI dump is a single
+        # line longer than the stream reader's line limit
+        output = bytearray()
+        deadline = time.monotonic() + timeout
+        while True:
+            idx = output.find(marker)
+            if idx >= 0 and output.find(b"\n", idx) >= 0:
+                break
+            
+            chunk = await asyncio.wait_for(shell.stdout.read(65536),
+                                           max(deadline - time.monotonic(), 0))
+            if not chunk:
+                raise ConnectionError("shell session closed")
+            output += chunk
+        
+        tail = output[idx + len(marker):output.find(b"\n", idx)].decode(errors="replace")
+        exit_status, _, error = tail.partition(" ")
+        if exit_status.strip() == "0":
+            return bytes(output[:idx])
+        
+        if log_failure:
+            self.logger.error(f"Command failed: {command}, exit status: {exit_status.strip()}, "
+                              f"Error: {error.strip()}")
+        return None
+    
+    async def _execute_raw(self, command: str, timeout: int = 30,
+                           log_failure: bool = True) -> Optional[bytes]:
+        """Execute ADB shell command and return its undecoded output
+        
+        Commands share one shell session, so concurrent calls take turns.
+        """
+        if self._shell_lock is None:
+            self._shell_lock = asyncio.Lock()
+        
+        async with self._shell_lock:
+            try:
+                return await self._run_in_shell(command, timeout, log_failure)
+            except asyncio.TimeoutError:
+                self.logger.error(f"Command timeout: {command}")
+            except asyncio.CancelledError:
+                # Its output would otherwise be read by the next command
+                self._kill_shell()
+                raise
+            except Exception as e:
+                self.logger.error(f"Command execution error: {e}")
+            
+            # The session's state is unknown after a failure
+            self._kill_shell()
+            return None
+    
+    async def execute_command(self, command: str, timeout: int = 30) -> Optional[str]:
+        """Execute ADB shell command"""
+        result = await self._execute_raw(command, timeout)
+        return result.decode("utf-8", errors="replace") if result is not None else None
+    
+    async def get_device_info(self) -> Optional[DeviceInfo]:
+        """Get detailed device information"""
+        if self._device_info is not None:
+            return self._device_info
+        
+        result = await self.execute_command(
+            "; ".join(f"getprop {prop}" for prop in DEVICE_INFO_PROPS)
+        )
+        device_info = _parse_device_info(self.device_id, result)
+        if device_info.api_level is not None:
+            self._device_info = device_info
+        return device_info
+    
+    async def is_app_installed(self) -> bool:
+        """Check if the Fire TV app is installed"""
+        result = await self.execute_command("pm list packages")
+        return result is not None and f"package:{self.app_package}" in result.split()
+    
+    async def _api_level(self) -> int:
+        """Device API level, 0 if it could not be determined"""
+        device_info = await self.get_device_info()
+        return (device_info.api_level or 0) if device_info else 0
+    
+    async def _am(self) -> str:
+        """Activity manager command for this device"""
+        return "cmd activity" if await self._api_level() >= _CMD_ACTIVITY_MIN_API else "am"
+    
+    async def _input(self) -> str:
+        """Input command for this device"""
+        return "cmd input" if await self._api_level() >= _CMD_INPUT_MIN_API else "input"
+    
+    async def is_app_running(self) -> bool:
+        """Check if the app is currently running"""
+        api_level = await self._api_level()
+        result = await self.execute_command("ps -A" if api_level >= _PS_ALL_MIN_API else "ps")
+        return result is not None and self.app_package in result
+    
+    async def start_app(self) -> bool:
+        """Start the Fire TV app"""
+        result = await self.execute_command(
+            f"{await self._am()} start -n {self.app_package}/{self.app_activity}"
+        )
+        return result is not None and "Starting" in result
+    
+    async def force_stop_app(self) -> bool:
+        """Force stop the app"""
+        result = await self.execute_command(f"{await self._am()} force-stop {self.app_package}")
+        return result is not None
+    
+    async def get_app_memory_usage(self) -> Optional[Dict[str, Any]]:
+        """Get app memory usage information"""
+        result = await self._execute_raw(f"dumpsys meminfo {self.app_package}")
+        return _parse_memory_usage(result) if result else None
+    
+    async def send_key_event(self, key_code: int) -> bool:
+        """Send key event to device"""
+        result = await self.execute_command(f"{await self._input()} keyevent {key_code}")
+        return result is not None
+    
+    async def get_screen_dump(self) -> Optional[str]:
+        """Get UI hierarchy dump"""
+        if self.compressed_ui_dump and self._dump_compressed is not False:
+            result = await self._execute_raw(_UI_DUMP_COMPRESSED,
+                                             log_failure=self._dump_compressed is not None)
+            if result is not None:
+                self._dump_compressed = True
+                return result.decode("utf-8", errors="replace")
+            if self._dump_compressed:
+                return None
+        
+        result = await self.execute_command(_UI_DUMP)
+        if result is not None and self.compressed_ui_dump and self._dump_compressed is None:
+            self.logger.info("uiautomator doesn't support --compressed, using full dumps")
+            self._dump_compressed = False
+        return result
+    
+    async def get_current_activity(self) -> Optional[str]:
+        """Get current activity name"""
+        result = await self.execute_command("dumpsys window windows | grep mCurrentFocus")
+        return _parse_current_activity(result) if result else None
+    
+    async def health_snapshot(self) -> Optional[HealthSnapshot]:
+        """Run all health check probes in a single shell round-trip"""
+        if self.compressed_ui_dump and self._dump_compressed is None:
+            await self.get_screen_dump()
+        ui_dump = (_UI_DUMP_COMPRESSED if self.compressed_ui_dump and self._dump_compressed
+                   else _UI_DUMP)
+        ps = "ps -A" if await self._api_level() >= _PS_ALL_MIN_API else "ps"
+        marker = f"__PROBE_{uuid.uuid4().hex}__"
+        
+        result = await self._execute_raw(_health_script(ps, self.app_package, ui_dump, marker))
+        return _parse_health_snapshot(result, marker, self.app_package) if result else None
+    
+    async def install_apk(self, apk_path: str) -> bool:
+        """Install APK on device"""
+        try:
+            returncode, stdout, _ = await self._run(
+                [ADB_BINARY, "-s", self.device_id, "install", "-r", apk_path], 60
+            )
+            return returncode == 0 and b"Success" in stdout
+        except Exception as e:
+            self.logger.error(f"Error installing APK: {e}")
+            return False
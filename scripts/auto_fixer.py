@@ -4,16 +4,27 @@ Auto-Fix Engine for Fire TV App Monitoring
 Implements automated fixes for detected errors
 """
 
+import heapq
 import logging
 import time
 import json
 import subprocess
-from typing import Dict, List, Optional, Any, Callable
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from dataclasses import dataclass
 from enum import Enum
 from adb_manager import ADBManager
 from error_detector import DetectedError, ErrorSeverity
 
+# Shared by all fixers to overlap independent adb work
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="autofix")
+
+# Activity manager arguments asking apps to release memory
+_TRIM_MEMORY = "broadcast -a android.intent.action.TRIM_MEMORY"
+
 class FixResult(Enum):
     SUCCESS = "success"
     FAILED = "failed"
@@ -33,14 +44,28 @@ class FixAction:
 class AutoFixer:
     """Automated error fixing engine"""
     
-    def __init__(self, adb_manager: ADBManager):
+    def __init__(self, adb_manager: ADBManager, history_size: int = 1000):
         self.adb = adb_manager
         self.logger = logging.getLogger(__name__)
         self.fix_strategies = self._initialize_fix_strategies()
-        self.fix_history: List[FixAction] = []
+        # Oldest entries are evicted; statistics are kept by the counters below
+        self.fix_history: deque = deque(maxlen=history_size)
         self.max_fix_attempts = 3
         self.fix_cooldown = 60  # seconds between fix attempts for same error type
         self.last_fix_times: Dict[str, float] = {}
+        self._cooldown_heap: List[Tuple[float, str]] = []  # (expiry, error_type)
+        
+        # Fixes run on worker threads while the monitor checks cooldowns and
+        # reads statistics from its loop, so the heap and the counters below
+        # are only touched under this lock
+        self._lock = threading.Lock()
+        
+        # Running totals for get_fix_statistics, updated as fixes are recorded
+        self._total_fixes = 0
+        self._success_count = 0
+        self._type_counters: Dict[str, Dict[str, int]] = {}
+        self._recent: deque = deque()  # timestamps of fixes in the last hour
+        self._recent_window = 3600
         
     def _initialize_fix_strategies(self) -> Dict[str, Callable]:
         """Initialize fix strategies for different error types"""
@@ -62,23 +87,37 @@ class AutoFixer:
             "unexpected_activity": self._fix_unexpected_activity
         }
     
+    def next_available_ts(self) -> float:
+        """Time the earliest running cooldown ends, 0.0 if none is running"""
+        now = time.time()
+        with self._lock:
+            while self._cooldown_heap and self._cooldown_heap[0][0] <= now:
+                heapq.heappop(self._cooldown_heap)
+            return self._cooldown_heap[0][0] if self._cooldown_heap else 0.0
+    
     def can_attempt_fix(self, error_type: str) -> bool:
         """Check if we can attempt a fix (not in cooldown)"""
+        if not self.next_available_ts():
+            return True
+        
         last_fix_time = self.last_fix_times.get(error_type, 0)
         return time.time() - last_fix_time >= self.fix_cooldown
     
     def apply_fix(self, error: DetectedError) -> Optional[FixAction]:
         """Apply appropriate fix for the detected error"""
-        if not self.can_attempt_fix(error.error_type):
-            self.logger.info(f"Fix for {error.error_type} is in cooldown")
+        # Strategy keys are interned literals, so lookups hit on identity
+        error_type = sys.intern(error.error_type)
+        
+        if not self.can_attempt_fix(error_type):
+            self.logger.info(f"Fix for {error_type} is in cooldown")
             return None
         
-        fix_strategy = self.fix_strategies.get(error.error_type)
+        fix_strategy = self.fix_strategies.get(error_type)
         if not fix_strategy:
-            self.logger.warning(f"No fix strategy for error type: {error.error_type}")
+            self.logger.warning(f"No fix strategy for error type: {error_type}")
             return None
         
-        self.logger.info(f"Attempting to fix {error.error_type}")
+        self.logger.info(f"Attempting to fix {error_type}")
         start_time = time.time()
         
         try:
@@ -86,26 +125,28 @@ class AutoFixer:
             duration = time.time() - start_time
             
             fix_action = FixAction(
-                action_name=f"fix_{error.error_type}",
+                action_name=sys.intern(f"fix_{error_type}"),
                 result=result,
-                message=f"Fix attempt for {error.error_type}",
+                message=f"Fix attempt for {error_type}",
                 details={"original_error": error.to_dict()},
                 timestamp=start_time,
                 duration=duration
             )
             
-            self.fix_history.append(fix_action)
-            self.last_fix_times[error.error_type] = start_time
+            self._record_fix(fix_action)
+            with self._lock:
+                self.last_fix_times[error_type] = start_time
+                heapq.heappush(self._cooldown_heap, (start_time + self.fix_cooldown, error_type))
             
-            self.logger.info(f"Fix result for {error.error_type}: {result.value}")
+            self.logger.info(f"Fix result for {error_type}: {result.value}")
             return fix_action
             
         except Exception as e:
             duration = time.time() - start_time
-            self.logger.error(f"Fix failed for {error.error_type}: {e}")
+            self.logger.error(f"Fix failed for {error_type}: {e}")
             
             fix_action = FixAction(
-                action_name=f"fix_{error.error_type}",
+                action_name=sys.intern(f"fix_{error_type}"),
                 result=FixResult.FAILED,
                 message=f"Fix failed: {str(e)}",
                 details={"error": str(e), "original_error": error.to_dict()},
@@ -113,9 +154,33 @@ class AutoFixer:
                 duration=duration
             )
             
-            self.fix_history.append(fix_action)
+            self._record_fix(fix_action)
             return fix_action
     
+    def _record_fix(self, fix_action: FixAction):
+        """Append a fix to the history and update the running statistics"""
+        successful = fix_action.result == FixResult.SUCCESS
+        
+        with self._lock:
+            self.fix_history.append(fix_action)
+            
+            self._total_fixes += 1
+            self._success_count += successful
+            
+            counters = self._type_counters.setdefault(
+                fix_action.action_name, {"total": 0, "successful": 0}
+            )
+            counters["total"] += 1
+            counters["successful"] += successful
+            
+            self._recent.append(fix_action.timestamp)
+            self._expire_recent(time.time())
+    
+    def _expire_recent(self, now: float):
+        """Drop fix timestamps that fell out of the recent window, under _lock"""
+        while self._recent and now - self._recent[0] > self._recent_window:
+            self._recent.popleft()
+    
     def _fix_app_crash(self, error: DetectedError) -> FixResult:
         """Fix app crash by restarting the app"""
         self.logger.info("Fixing app crash by restarting app")
@@ -127,11 +192,9 @@ class AutoFixer:
         # Wait a moment
         time.sleep(2)
         
-        # Start the app again
-        if self.adb.start_app():
-            time.sleep(5)  # Wait for app to start
-            if self.adb.is_app_running():
-                return FixResult.SUCCESS
+        # Start the app again and wait for it to come up
+        if self.adb.start_app() and self.adb.wait_until_running(timeout=5):
+            return FixResult.SUCCESS
         
         return FixResult.FAILED
     
@@ -150,10 +213,8 @@ class AutoFixer:
         time.sleep(3)
         
         # Restart app
-        if self.adb.start_app():
-            time.sleep(5)
-            if self.adb.is_app_running():
-                return FixResult.SUCCESS
+        if self.adb.start_app() and self.adb.wait_until_running(timeout=5):
+            return FixResult.SUCCESS
         
         return FixResult.FAILED
     
@@ -173,7 +234,7 @@ class AutoFixer:
             
             # Restart app
             if self.adb.start_app():
-                time.sleep(5)
+                self.adb.wait_until_running(timeout=5)
                 return FixResult.SUCCESS
         except Exception as e:
             self.logger.error(f"Failed to clear cache: {e}")
@@ -188,13 +249,12 @@ class AutoFixer:
         if self.adb.is_app_running():
             # Navigate to refresh button and press it
             # Up arrow to toolbar, then right arrows to refresh button
-            self.adb.send_key_event(19)  # KEYCODE_DPAD_UP (to toolbar)
-            time.sleep(0.5)
-            self.adb.send_key_event(22)  # KEYCODE_DPAD_RIGHT (to forward)
-            time.sleep(0.5)
-            self.adb.send_key_event(22)  # KEYCODE_DPAD_RIGHT (to refresh)
-            time.sleep(0.5)
-            self.adb.send_key_event(23)  # KEYCODE_DPAD_CENTER (press refresh)
+            self.adb.send_key_events([
+                19,  # KEYCODE_DPAD_UP (to toolbar)
+                22,  # KEYCODE_DPAD_RIGHT (to forward)
+                22,  # KEYCODE_DPAD_RIGHT (to refresh)
+                23   # KEYCODE_DPAD_CENTER (press refresh)
+            ], delay=0.5)
             
             return FixResult.SUCCESS
         
@@ -217,14 +277,13 @@ class AutoFixer:
         self.logger.info("Fixing profile error by navigating to profiles")
         
         if self.adb.is_app_running():
-            # Navigate to profiles button and open profiles
-            self.adb.send_key_event(19)  # KEYCODE_DPAD_UP (to toolbar)
-            time.sleep(0.5)
-            # Navigate to profiles button (last button)
-            for _ in range(5):  # Navigate to end
-                self.adb.send_key_event(22)  # KEYCODE_DPAD_RIGHT
-                time.sleep(0.3)
-            self.adb.send_key_event(23)  # KEYCODE_DPAD_CENTER (open profiles)
+            # Navigate to profiles button (last button) and open profiles
+            self.adb.send_key_events(
+                [19]         # KEYCODE_DPAD_UP (to toolbar)
+                + [22] * 5   # KEYCODE_DPAD_RIGHT (navigate to end)
+                + [23],      # KEYCODE_DPAD_CENTER (open profiles)
+                delay=[0.5] + [0.3] * 5
+            )
             
             return FixResult.PARTIAL
         
@@ -241,7 +300,7 @@ class AutoFixer:
         if self.adb.clear_app_data():
             time.sleep(3)
             if self.adb.start_app():
-                time.sleep(5)
+                self.adb.wait_until_running(timeout=5)
                 return FixResult.SUCCESS
         
         return FixResult.FAILED
@@ -251,11 +310,11 @@ class AutoFixer:
         self.logger.info("Fixing focus error by resetting navigation")
         
         if self.adb.is_app_running():
-            # Send back key to reset focus
-            self.adb.send_key_event(4)  # KEYCODE_BACK
-            time.sleep(1)
-            # Send center key to establish focus
-            self.adb.send_key_event(23)  # KEYCODE_DPAD_CENTER
+            # Send back key to reset focus, then center key to establish focus
+            self.adb.send_key_events([
+                4,   # KEYCODE_BACK
+                23   # KEYCODE_DPAD_CENTER
+            ], delay=1)
             
             return FixResult.PARTIAL
         
@@ -270,10 +329,8 @@ class AutoFixer:
         """Fix app not running by starting it"""
         self.logger.info("Fixing app not running by starting app")
         
-        if self.adb.start_app():
-            time.sleep(5)
-            if self.adb.is_app_running():
-                return FixResult.SUCCESS
+        if self.adb.start_app() and self.adb.wait_until_running(timeout=5):
+            return FixResult.SUCCESS
         
         return FixResult.FAILED
     
@@ -285,7 +342,7 @@ class AutoFixer:
         if self.adb.is_app_running():
             try:
                 # Send system-level GC trigger
-                self.adb.execute_command("am broadcast -a android.intent.action.TRIM_MEMORY")
+                self.adb.execute_command(self.adb.am_command(_TRIM_MEMORY))
                 time.sleep(2)
                 return FixResult.PARTIAL
             except Exception:
@@ -339,17 +396,12 @@ class AutoFixer:
     def _recover_to_main_activity(self) -> FixResult:
         """Navigate back to main activity when UI elements are genuinely missing"""
         try:
-            # Press back button to potentially exit menus/dialogs
-            self.adb.send_key_event(4)  # KEYCODE_BACK
-            time.sleep(0.5)
-            
-            # Press home button to go to main activity
-            self.adb.send_key_event(3)  # KEYCODE_HOME (app home, not system home)
-            time.sleep(1)
-            
-            # Try to focus on main content
-            self.adb.send_key_event(23)  # KEYCODE_DPAD_CENTER
-            time.sleep(0.5)
+            # Back out of menus/dialogs, go to main activity and focus main content
+            self.adb.send_key_events([
+                4,   # KEYCODE_BACK
+                3,   # KEYCODE_HOME (app home, not system home)
+                23   # KEYCODE_DPAD_CENTER
+            ], delay=[0.5, 1, 0.5])
             
             return FixResult.PARTIAL
             
@@ -361,10 +413,10 @@ class AutoFixer:
         """Gentle recovery method for ambiguous situations"""
         try:
             # Send a simple navigation to refresh state
-            self.adb.send_key_event(20)  # KEYCODE_DPAD_DOWN
-            time.sleep(0.3)
-            self.adb.send_key_event(19)  # KEYCODE_DPAD_UP
-            time.sleep(0.3)
+            self.adb.send_key_events([
+                20,  # KEYCODE_DPAD_DOWN
+                19   # KEYCODE_DPAD_UP
+            ], delay=[0.3, 0.3])
             
             return FixResult.PARTIAL
             
@@ -378,11 +430,11 @@ class AutoFixer:
         
         if self.adb.is_app_running():
             # Send directional keys to establish focus
-            self.adb.send_key_event(20)  # KEYCODE_DPAD_DOWN
-            time.sleep(0.5)
-            self.adb.send_key_event(19)  # KEYCODE_DPAD_UP
-            time.sleep(0.5)
-            self.adb.send_key_event(23)  # KEYCODE_DPAD_CENTER
+            self.adb.send_key_events([
+                20,  # KEYCODE_DPAD_DOWN
+                19,  # KEYCODE_DPAD_UP
+                23   # KEYCODE_DPAD_CENTER
+            ], delay=0.5)
             
             return FixResult.PARTIAL
         
@@ -393,43 +445,25 @@ class AutoFixer:
         self.logger.info("Fixing unexpected activity by navigating to main")
         
         # Send back key multiple times to get to main activity
-        for _ in range(3):
-            self.adb.send_key_event(4)  # KEYCODE_BACK
-            time.sleep(1)
+        self.adb.send_key_events([4] * 3, delay=[1, 1, 1])  # KEYCODE_BACK
         
         return FixResult.PARTIAL
     
     def get_fix_statistics(self) -> Dict[str, Any]:
         """Get statistics about fix attempts"""
-        if not self.fix_history:
-            return {"total_fixes": 0}
-        
-        stats = {
-            "total_fixes": len(self.fix_history),
-            "success_rate": 0,
-            "fix_types": {},
-            "recent_fixes": 0
-        }
-        
-        # Calculate success rate
-        successful_fixes = [f for f in self.fix_history if f.result == FixResult.SUCCESS]
-        stats["success_rate"] = len(successful_fixes) / len(self.fix_history) * 100
-        
-        # Count fix types
-        for fix in self.fix_history:
-            action_name = fix.action_name
-            if action_name not in stats["fix_types"]:
-                stats["fix_types"][action_name] = {"total": 0, "successful": 0}
+        with self._lock:
+            if not self._total_fixes:
+                return {"total_fixes": 0}
             
-            stats["fix_types"][action_name]["total"] += 1
-            if fix.result == FixResult.SUCCESS:
-                stats["fix_types"][action_name]["successful"] += 1
-        
-        # Recent fixes (last hour)
-        recent_time = time.time() - 3600
-        stats["recent_fixes"] = len([f for f in self.fix_history if f.timestamp >= recent_time])
-        
-        return stats
+            # Recent fixes (last hour)
+            self._expire_recent(time.time())
+            
+            return {
+                "total_fixes": self._total_fixes,
+                "success_rate": self._success_count / self._total_fixes * 100,
+                "fix_types": {name: dict(counts) for name, counts in self._type_counters.items()},
+                "recent_fixes": len(self._recent)
+            }
     
     def emergency_recovery(self) -> bool:
         """Emergency recovery procedure for severe issues"""
@@ -437,15 +471,14 @@ class AutoFixer:
         
         try:
             # 1. Force stop app
-            self.adb.force_stop_app()
-            time.sleep(3)
-            
-            # 2. Clear app cache (not data)
-            self.adb.execute_command("pm trim-caches 500M")
-            time.sleep(2)
+            self.adb.execute_script([self.adb.am_command(f"force-stop {self.adb.app_package}")],
+                                   sleeps=[3])
             
-            # 3. Ensure ADB connection
-            if not self.adb.ensure_connection():
+            # 2. Clear app cache (not data) while 3. ensuring the ADB connection
+            trim = _EXECUTOR.submit(self.adb.execute_script, ["pm trim-caches 500M"], [2])
+            connection = _EXECUTOR.submit(self.adb.ensure_connection)
+            wait([trim, connection])
+            if not connection.result():
                 return False
             
             # 4. Restart app
@@ -453,8 +486,7 @@ class AutoFixer:
                 return False
             
             # 5. Wait and verify
-            time.sleep(10)
-            if self.adb.is_app_running():
+            if self.adb.wait_until_running(timeout=10):
                 self.logger.info("Emergency recovery successful")
                 return True
             
@@ -473,7 +505,7 @@ class AutoFixer:
             self.adb.execute_command("pm trim-caches 200M")
             
             # Force garbage collection
-            self.adb.execute_command("am broadcast -a android.intent.action.TRIM_MEMORY")
+            self.adb.execute_command(self.adb.am_command(_TRIM_MEMORY))
             
             return True
             
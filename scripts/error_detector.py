@@ -4,23 +4,133 @@ Error Detection Engine for Fire TV App Monitoring
 Detects various types of errors and issues in real-time
 """
 
+import bisect
+import heapq
+import multiprocessing
+import os
 import re
 import logging
 import time
-from typing import Dict, List, Optional, Callable, Any
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from typing import Dict, List, Optional, Callable, Any, Tuple
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
 import json
 
-class ErrorSeverity(Enum):
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-    CRITICAL = "critical"
+try:
+    import re2  # optional linear-time engine, see requirements.txt
+except ImportError:
+    re2 = None
 
-@dataclass
+def _compile(pattern: str, flags: int = 0):
+    """Compile with re2 when installed, falling back to re for what it can't parse"""
+    if re2 is not None:
+        inline = "".join(letter for flag, letter in ((re.IGNORECASE, "i"), (re.MULTILINE, "m"))
+                         if flags & flag)
+        try:
+            return re2.compile(f"(?{inline}){pattern}" if inline else pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern, flags)
+
+# Lines from other processes are only analyzed if they contain one of these
+_GATE_KEYWORDS = ("fatal", "error", "exception", "crash", "anr")
+
+# Class name ahead of the colon in a "java.lang.FooException: message" line
+_EXCEPTION_TYPE = re.compile(r"([\w.$]+(?:Exception|Error)):")
+
+# Activities the app is expected to be showing
+EXPECTED_ACTIVITIES = (
+    "com.webviewer.firetv.MainActivity",
+    "com.webviewer.firetv.SettingsActivity",
+    "com.webviewer.firetv.ProfilesActivity",
+    "com.webviewer.firetv.ProfileEditActivity"
+)
+_EXPECTED_ACTIVITY_SET = frozenset(EXPECTED_ACTIVITIES)
+
+def _activity_class_name(component: str) -> str:
+    """Full class name from a `pkg/cls` component, expanding `pkg/.Cls`"""
+    package, _, class_name = component.partition("/")
+    if not class_name:
+        return package
+    return package + class_name if class_name.startswith(".") else class_name
+
+def _lowercase_pattern(source: str) -> str:
+    """Lowercase a regex source, leaving backslash escapes such as \\S intact"""
+    return re.sub(r"\\.|[^\\]+",
+                  lambda m: m.group() if m.group().startswith("\\") else m.group().lower(),
+                  source)
+
+try:
+    import ahocorasick  # optional literal prefilter, see requirements.txt
+except ImportError:
+    ahocorasick = None
+
+def _branch_literals(source: str) -> Optional[List[str]]:
+    """Longest literal every match of each top-level branch must contain
+    
+    Returns None for patterns with groups or a branch without a usable
+    literal, which can't be screened by literals.
+    """
+    literals = []
+    runs, run = [], ""
+    i = 0
+    while i <= len(source):
+        char = source[i] if i < len(source) else "|"
+        if char == "|":
+            runs.append(run)
+            longest = max(runs, key=len)
+            if len(longest) < 3:
+                return None
+            literals.append(longest.lower())
+            runs, run = [], ""
+        elif char == "\\" and i + 1 < len(source):
+            i += 1
+            if source[i].isalnum():  # a class such as \d or \s
+                runs.append(run)
+                run = ""
+            else:
+                run += source[i]
+        elif char in "*?{":
+            # The previous character is optional, so it isn't required
+            runs.append(run[:-1])
+            run = ""
+        elif char in "()":
+            return None
+        elif char in ".^$[]+":
+            runs.append(run)
+            run = ""
+        else:
+            run += char
+        i += 1
+    return literals
+
+def _is_literal_alternation(source: str) -> bool:
+    """Whether a pattern is only literal branches, allowing escaped punctuation"""
+    return re.fullmatch(r"(?:[^\\.^$*+?{}\[\]()]|\\[^0-9A-Za-z])+", source) is not None
+
+class ErrorSeverity(IntEnum):
+    """Ordered by rank so severities compare as ints"""
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+    CRITICAL = 4
+    
+    @property
+    def label(self) -> str:
+        """Lowercase name used in reports, logs and summaries"""
+        return self.name.lower()
+
+@dataclass(frozen=True)
 class DetectedError:
     """Represents a detected error"""
+    # Up to a full history of these is kept, so no per-instance __dict__
+    # (declared by hand since dataclass(slots=True) needs Python 3.10);
+    # _dict holds the to_dict() result once built
+    __slots__ = ("error_type", "severity", "message", "details", "timestamp", "source", "_dict")
+    
     error_type: str
     severity: ErrorSeverity
     message: str
@@ -29,21 +139,44 @@ class DetectedError:
     source: str  # logcat, memory, ui, etc.
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        """Serializable form, built once since the error is frozen"""
+        try:
+            return self._dict
+        except AttributeError:
+            pass
+        
+        result = {
             "error_type": self.error_type,
-            "severity": self.severity.value,
+            "severity": self.severity.label,
             "message": self.message,
             "details": self.details,
             "timestamp": self.timestamp,
             "source": self.source
         }
+        object.__setattr__(self, "_dict", result)
+        return result
+    
+    def __reduce__(self):
+        # Default slot pickling assigns fields one by one, which frozen forbids
+        return (DetectedError, (self.error_type, self.severity, self.message,
+                                self.details, self.timestamp, self.source))
 
 class ErrorPattern:
     """Defines a pattern for detecting specific errors"""
     def __init__(self, name: str, pattern: str, severity: ErrorSeverity, 
                  extract_func: Optional[Callable] = None):
         self.name = name
-        self.pattern = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+        self.source = pattern
+        # No pattern anchors with ^ or $, so MULTILINE would change nothing
+        self.pattern = _compile(pattern, re.IGNORECASE)
+        # Lowercase literals one of which every match contains, when the
+        # pattern has them; a line with none of them is rejected by substring
+        # checks without running the regex
+        literals = _branch_literals(pattern)
+        self.literals: Optional[Tuple[str, ...]] = tuple(literals) if literals else None
+        # Those literals are the whole pattern, so the first one found is
+        # where the match starts
+        self._literal_only = self.literals is not None and _is_literal_alternation(pattern)
         self.severity = severity
         self.extract_func = extract_func or self._default_extract
     
@@ -51,9 +184,23 @@ class ErrorPattern:
         """Default extraction function"""
         return {"matched_text": match.group(0)}
     
-    def match(self, text: str) -> Optional[Dict[str, Any]]:
-        """Check if pattern matches and extract details"""
-        match = self.pattern.search(text)
+    def match(self, text: str, lowered: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Check if pattern matches and extract details
+        
+        `lowered` is text.lower(), passed in by callers that already have it.
+        """
+        if self.literals is not None:
+            if lowered is None:
+                lowered = text.lower()
+            if self._literal_only and len(lowered) == len(text):
+                starts = [index for index in map(lowered.find, self.literals) if index >= 0]
+                match = self.pattern.match(text, min(starts)) if starts else None
+            elif not any(literal in lowered for literal in self.literals):
+                return None
+            else:
+                match = self.pattern.search(text)
+        else:
+            match = self.pattern.search(text)
         if match:
             return self.extract_func(match)
         return None
@@ -61,14 +208,63 @@ class ErrorPattern:
 class ErrorDetector:
     """Main error detection engine"""
     
-    def __init__(self, config: Optional[Dict[str, Any]] = None):
+    # app_package -> (patterns, combined prescreen, literal index)
+    _PATTERN_CACHE: Dict[str, Tuple[List[ErrorPattern], Any, Any]] = {}
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None, history_size: int = 1000):
         self.logger = logging.getLogger(__name__)
         self.app_package = "com.webviewer.firetv"
         self.config = config or {}
         self.ui_config = self.config.get("ui_monitoring", {})
-        self.error_patterns = self._initialize_patterns()
-        self.error_history: List[DetectedError] = []
-        self.max_history_size = 1000
+        
+        # UI monitoring options, resolved once instead of on every dump
+        self._state_aware = self.ui_config.get("state_aware_checking", True)
+        self._expected_by_state = self.ui_config.get("expected_elements_by_state", {})
+        self._ignore_missing_states = frozenset(
+            self.ui_config.get("ignore_missing_elements_in_states", [])
+        )
+        self._strict_checking = self.ui_config.get("strict_element_checking", False)
+        focus_config = self.ui_config.get("focus_monitoring", {})
+        self._focus_enabled = focus_config.get("enabled", True)
+        self._ignore_focus_states = frozenset(focus_config.get("ignore_in_states", []))
+        
+        # Compiled once per app package and shared by all detectors
+        compiled = ErrorDetector._PATTERN_CACHE.get(self.app_package)
+        if compiled is None:
+            patterns = self._initialize_patterns()
+            # Every pattern in one case-sensitive alternation run on the
+            # lowercased line: sre only scans ahead by first character when
+            # branches start with a literal, which IGNORECASE and groups
+            # (even (?:) ones) prevent, so this rules out a clean line in one pass
+            prescreen = _compile("|".join(
+                _lowercase_pattern(pattern.source) for pattern in patterns
+            ))
+            compiled = (patterns, prescreen, self._build_literal_index(patterns))
+            ErrorDetector._PATTERN_CACHE[self.app_package] = compiled
+        self.error_patterns, self._prescreen, self._literal_index = compiled
+        self.max_history_size = history_size
+        # Oldest errors are evicted on append once the history is full
+        self.error_history: deque = deque(maxlen=self.max_history_size)
+        # Running maximum of the history's timestamps, kept in step with it
+        # so the recent cutoff can be bisected
+        self._timestamps: deque = deque(maxlen=self.max_history_size)
+        
+        # Last-hour counts for get_error_summary, kept as errors arrive and
+        # expire; the heap orders (expires_at, error_type, severity) entries
+        self._summary_window = 3600
+        self._recent_type_counts: Counter = Counter()
+        self._recent_severity_counts: Counter = Counter()
+        self._recent_expiry: List[Tuple[float, str, str]] = []
+        
+        # Recent timestamps per error type for the repeated-error check
+        self._recent_by_type: Dict[str, deque] = defaultdict(lambda: deque(maxlen=50))
+        
+        # Worker processes for analyze_logcat_batch, started on first use
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.batch_chunk_size = 1000
+        
+        # Total PSS from the previous analyze_memory_usage call
+        self._last_memory_usage: Optional[int] = None
         
     def _initialize_patterns(self) -> List[ErrorPattern]:
         """Initialize all error detection patterns"""
@@ -157,30 +353,52 @@ class ErrorDetector:
         
         return patterns
     
-    def _extract_crash_info(self, match: re.Match) -> Dict[str, Any]:
+    @staticmethod
+    def _build_literal_index(patterns: List[ErrorPattern]):
+        """Aho-Corasick automaton from required literals to pattern names
+        
+        None when pyahocorasick isn't installed or a pattern has no
+        literal to screen on; the combined prescreen is used instead.
+        """
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for pattern in patterns:
+            if pattern.literals is None:
+                return None
+            for literal in pattern.literals:
+                names = automaton.get(literal, ())
+                if pattern.name not in names:
+                    automaton.add_word(literal, names + (pattern.name,))
+        automaton.make_automaton()
+        return automaton
+    
+    @staticmethod
+    def _extract_crash_info(match: re.Match) -> Dict[str, Any]:
         """Extract crash information from logcat"""
         full_text = match.string
-        lines = full_text.split('\n')
-        crash_lines = []
-        
-        # Find the start of the crash
-        start_idx = 0
-        for i, line in enumerate(lines):
-            if "FATAL EXCEPTION" in line:
-                start_idx = i
+        
+        # The crash starts on the matched line; only the 20 lines from there
+        # are split out, however much text the match was found in
+        start = full_text.rfind("\n", 0, match.start()) + 1
+        end = start
+        for _ in range(20):
+            end = full_text.find("\n", end) + 1
+            if not end:
+                end = len(full_text)
                 break
         
-        # Collect crash lines
-        for i in range(start_idx, min(start_idx + 20, len(lines))):
-            if lines[i].strip():
-                crash_lines.append(lines[i])
+        crash_text = full_text[start:end]
+        crash_lines = [line for line in crash_text.split("\n") if line.strip()]
         
         return {
             "crash_trace": crash_lines,
-            "exception_type": self._extract_exception_type(crash_lines)
+            "exception_type": ErrorDetector._extract_exception_type(crash_text)
         }
     
-    def _extract_anr_info(self, match: re.Match) -> Dict[str, Any]:
+    @staticmethod
+    def _extract_anr_info(match: re.Match) -> Dict[str, Any]:
         """Extract ANR information"""
         text = match.group(0)
         return {
@@ -188,7 +406,8 @@ class ErrorDetector:
             "reason": "Application not responding"
         }
     
-    def _extract_network_error(self, match: re.Match) -> Dict[str, Any]:
+    @staticmethod
+    def _extract_network_error(match: re.Match) -> Dict[str, Any]:
         """Extract network error details"""
         error_text = match.group(0)
         return {
@@ -196,7 +415,8 @@ class ErrorDetector:
             "error_type": "connectivity"
         }
     
-    def _extract_webview_error(self, match: re.Match) -> Dict[str, Any]:
+    @staticmethod
+    def _extract_webview_error(match: re.Match) -> Dict[str, Any]:
         """Extract WebView error details"""
         error_text = match.group(0)
         return {
@@ -204,40 +424,86 @@ class ErrorDetector:
             "component": "webview"
         }
     
-    def _extract_exception_type(self, crash_lines: List[str]) -> Optional[str]:
-        """Extract exception type from crash lines"""
-        for line in crash_lines:
-            if "Exception:" in line or "Error:" in line:
-                parts = line.split(":")
-                if len(parts) >= 2:
-                    return parts[0].split()[-1]  # Get the exception class name
-        return None
+    @staticmethod
+    def _extract_exception_type(crash_text: str) -> Optional[str]:
+        """Extract exception type from the crash trace"""
+        match = _EXCEPTION_TYPE.search(crash_text)
+        return match.group(1) if match else None
     
-    def analyze_logcat_line(self, line: str) -> List[DetectedError]:
+    def analyze_logcat_line(self, line: str, now: Optional[float] = None) -> List[DetectedError]:
         """Analyze a single logcat line for errors"""
+        now = time.time() if now is None else now
         detected_errors = []
         
+        # Lowercased once for the keyword gate and the prescreens
+        lowered = line.lower()
+        
         # Only analyze lines from our app or system errors that might affect us
-        if self.app_package in line or any(keyword in line.lower() for keyword in 
-                                          ["fatal", "error", "exception", "crash", "anr"]):
+        if self.app_package in line or any(keyword in lowered for keyword in _GATE_KEYWORDS):
+            
+            if self._literal_index is not None:
+                # Only patterns whose literals occur can match
+                candidates = {name for _, names in self._literal_index.iter(lowered)
+                              for name in names}
+                patterns = [p for p in self.error_patterns if p.name in candidates]
+            elif self._prescreen.search(lowered):
+                patterns = self.error_patterns
+            else:
+                patterns = []
             
-            for pattern in self.error_patterns:
-                match_details = pattern.match(line)
+            # One line can carry several error types, so each is matched
+            for pattern in patterns:
+                match_details = pattern.match(line, lowered)
                 if match_details:
                     error = DetectedError(
                         error_type=pattern.name,
                         severity=pattern.severity,
                         message=f"{pattern.name.replace('_', ' ').title()} detected",
                         details=match_details,
-                        timestamp=time.time(),
+                        timestamp=now,
                         source="logcat"
                     )
                     detected_errors.append(error)
         
         return detected_errors
     
-    def analyze_memory_usage(self, memory_info: Dict[str, Any]) -> List[DetectedError]:
+    def analyze_logcat_batch(self, lines: List[str], now: Optional[float] = None) -> List[DetectedError]:
+        """Analyze many logcat lines, sharding large batches across processes
+        
+        Regex matching holds the GIL, so only separate processes add cores.
+        Batches of up to one chunk, or any batch on a single core, stay
+        in-process where the pickling round-trip would cost more than it saves.
+        """
+        now = time.time() if now is None else now
+        
+        # Gated before sharding, so the lines that would be dropped anyway
+        # are never pickled and a mostly quiet batch stays in-process
+        lines = _gate_candidates(lines, self.app_package)
+        
+        if len(lines) <= self.batch_chunk_size or (os.cpu_count() or 1) < 2:
+            return _analyze_logcat_chunk(lines, now, self)
+        
+        if self._pool is None:
+            # spawn: forking a process that runs threads can deadlock the child
+            self._pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        
+        size = self.batch_chunk_size
+        chunks = [lines[i:i + size] for i in range(0, len(lines), size)]
+        detected_errors = []
+        for chunk_errors in self._pool.map(_analyze_logcat_chunk, chunks, repeat(now)):
+            detected_errors.extend(chunk_errors)
+        return detected_errors
+    
+    def close(self):
+        """Stop the batch worker processes, if any were started"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+    
+    def analyze_memory_usage(self, memory_info: Dict[str, Any],
+                             now: Optional[float] = None) -> List[DetectedError]:
         """Analyze memory usage for potential issues"""
+        now = time.time() if now is None else now
         detected_errors = []
         
         if not memory_info:
@@ -251,13 +517,13 @@ class ErrorDetector:
                 severity=ErrorSeverity.MEDIUM,
                 message=f"High memory usage detected: {total_pss}KB",
                 details={"memory_usage_kb": total_pss, "threshold_kb": 500000},
-                timestamp=time.time(),
+                timestamp=now,
                 source="memory"
             )
             detected_errors.append(error)
         
         # Check for memory leaks (rapid increase)
-        if hasattr(self, '_last_memory_usage'):
+        if self._last_memory_usage is not None:
             last_usage = self._last_memory_usage
             if total_pss > last_usage * 1.5:  # 50% increase
                 error = DetectedError(
@@ -269,7 +535,7 @@ class ErrorDetector:
                         "current_usage_kb": total_pss,
                         "increase_percentage": ((total_pss - last_usage) / last_usage) * 100
                     },
-                    timestamp=time.time(),
+                    timestamp=now,
                     source="memory"
                 )
                 detected_errors.append(error)
@@ -277,8 +543,9 @@ class ErrorDetector:
         self._last_memory_usage = total_pss
         return detected_errors
     
-    def analyze_ui_dump(self, ui_dump: str) -> List[DetectedError]:
+    def analyze_ui_dump(self, ui_dump: str, now: Optional[float] = None) -> List[DetectedError]:
         """Analyze UI dump for navigation and focus issues"""
+        now = time.time() if now is None else now
         detected_errors = []
         
         if not ui_dump:
@@ -290,6 +557,9 @@ class ErrorDetector:
         # State-aware UI element checking
         expected_elements = self._get_expected_elements_for_state(app_state, ui_dump)
         
+        # Separate substring checks on purpose: a regex alternation scans the
+        # dump several times slower, and its non-overlapping matches would
+        # hide ids that are prefixes of others (webView vs webViewCard)
         for element in expected_elements:
             if element not in ui_dump:
                 error = DetectedError(
@@ -301,23 +571,20 @@ class ErrorDetector:
                         "app_state": app_state,
                         "expected_elements": expected_elements
                     },
-                    timestamp=time.time(),
+                    timestamp=now,
                     source="ui"
                 )
                 detected_errors.append(error)
         
         # Check for focus issues (state-aware)
-        focus_config = self.ui_config.get("focus_monitoring", {})
-        if focus_config.get("enabled", True):
-            ignore_focus_states = focus_config.get("ignore_in_states", [])
-            
-            if app_state not in ignore_focus_states and "focused=\"true\"" not in ui_dump:
+        if self._focus_enabled:
+            if app_state not in self._ignore_focus_states and "focused=\"true\"" not in ui_dump:
                 error = DetectedError(
                     error_type="no_focused_element",
                     severity=ErrorSeverity.LOW,
                     message=f"No focused UI element detected (state: {app_state})",
                     details={"app_state": app_state},
-                    timestamp=time.time(),
+                    timestamp=now,
                     source="ui"
                 )
                 detected_errors.append(error)
@@ -330,16 +597,22 @@ class ErrorDetector:
         if "SettingsActivity" in ui_dump or "ProfilesActivity" in ui_dump or "ProfileEditActivity" in ui_dump:
             return "settings"
         
-        # Check if we're in loading state
-        if "loading" in ui_dump.lower() or "progress" in ui_dump.lower():
+        # Check if we're in loading state (one lowercase copy serves both;
+        # an IGNORECASE regex scans a dump over ten times slower)
+        lowered = ui_dump.lower()
+        if "loading" in lowered or "progress" in lowered:
             return "loading"
         
+        # Both visible-state checks below require no hidden views at all
+        if "visibility=\"gone\"" in ui_dump:
+            return "unknown"
+        
         # Check if we're showing error/welcome screen
-        if "welcomeContainer" in ui_dump and "visibility=\"gone\"" not in ui_dump:
+        if "welcomeContainer" in ui_dump:
             return "error_welcome"
         
         # Check if we have webview visible (browsing state)
-        if "webViewCard" in ui_dump and "visibility=\"gone\"" not in ui_dump:
+        if "webViewCard" in ui_dump:
             return "browsing"
         
         # Default state when unclear
@@ -348,29 +621,29 @@ class ErrorDetector:
     def _get_expected_elements_for_state(self, app_state: str, ui_dump: str) -> List[str]:
         """Get expected UI elements based on current app state"""
         # Check if state-aware checking is enabled
-        if not self.ui_config.get("state_aware_checking", True):
+        if not self._state_aware:
             # Fall back to original behavior if disabled
             return ["profilesButton", "webView", "browserToolbar"]
         
         # Use configuration for expected elements
-        expected_by_state = self.ui_config.get("expected_elements_by_state", {})
-        expected = expected_by_state.get(app_state, [])
+        expected = self._expected_by_state.get(app_state, [])
         
         # Check if we should ignore missing elements in this state
-        ignore_states = self.ui_config.get("ignore_missing_elements_in_states", [])
-        if app_state in ignore_states:
+        if app_state in self._ignore_missing_states:
             expected = []
         
         # Use strict checking if enabled
-        if self.ui_config.get("strict_element_checking", False):
+        if self._strict_checking:
             # In strict mode, be more demanding about expected elements
             if app_state == "browsing":
                 expected = ["profilesButton", "webView", "browserToolbar"]
         
         return expected
     
-    def analyze_app_state(self, is_running: bool, current_activity: Optional[str]) -> List[DetectedError]:
+    def analyze_app_state(self, is_running: bool, current_activity: Optional[str],
+                          now: Optional[float] = None) -> List[DetectedError]:
         """Analyze app state for issues"""
+        now = time.time() if now is None else now
         detected_errors = []
         
         # App should be running
@@ -380,26 +653,20 @@ class ErrorDetector:
                 severity=ErrorSeverity.HIGH,
                 message="App is not running when it should be",
                 details={"expected_state": "running", "actual_state": "stopped"},
-                timestamp=time.time(),
+                timestamp=now,
                 source="app_state"
             )
             detected_errors.append(error)
         
         # Check if app is in expected activity
-        expected_activities = [
-            "com.webviewer.firetv.MainActivity",
-            "com.webviewer.firetv.SettingsActivity",
-            "com.webviewer.firetv.ProfilesActivity",
-            "com.webviewer.firetv.ProfileEditActivity"
-        ]
-        
-        if current_activity and not any(activity in current_activity for activity in expected_activities):
+        if (current_activity and
+                _activity_class_name(current_activity) not in _EXPECTED_ACTIVITY_SET):
             error = DetectedError(
                 error_type="unexpected_activity",
                 severity=ErrorSeverity.LOW,
                 message=f"App in unexpected activity: {current_activity}",
-                details={"current_activity": current_activity, "expected_activities": expected_activities},
-                timestamp=time.time(),
+                details={"current_activity": current_activity, "expected_activities": list(EXPECTED_ACTIVITIES)},
+                timestamp=now,
                 source="app_state"
             )
             detected_errors.append(error)
@@ -409,55 +676,113 @@ class ErrorDetector:
     def add_detected_error(self, error: DetectedError):
         """Add error to history"""
         self.error_history.append(error)
-        
-        # Maintain history size limit
-        if len(self.error_history) > self.max_history_size:
-            self.error_history = self.error_history[-self.max_history_size:]
+        # Errors can arrive slightly out of order (a health check stamps its
+        # errors before its probes finish), hence the running maximum
+        if self._timestamps:
+            self._timestamps.append(max(error.timestamp, self._timestamps[-1]))
+        else:
+            self._timestamps.append(error.timestamp)
+        
+        self._recent_by_type[error.error_type].append(error.timestamp)
+        self._recent_type_counts[error.error_type] += 1
+        self._recent_severity_counts[error.severity.label] += 1
+        heapq.heappush(self._recent_expiry, (
+            error.timestamp + self._summary_window, error.error_type, error.severity.label
+        ))
         
         # Log the error
-        self.logger.error(f"Detected {error.severity.value} error: {error.error_type} - {error.message}")
+        self.logger.error(f"Detected {error.severity.label} error: {error.error_type} - {error.message}")
     
     def get_recent_errors(self, minutes: int = 5) -> List[DetectedError]:
         """Get errors from the last N minutes"""
         cutoff_time = time.time() - (minutes * 60)
-        return [error for error in self.error_history if error.timestamp >= cutoff_time]
+        
+        # Everything before start is older than the cutoff; the tail may
+        # still hold a few out-of-order older errors
+        start = bisect.bisect_left(self._timestamps, cutoff_time)
+        recent = list(islice(reversed(self.error_history), len(self.error_history) - start))
+        recent.reverse()
+        return [error for error in recent if error.timestamp >= cutoff_time]
+    
+    def _expire_summary_counts(self, now: float):
+        """Drop errors older than the summary window from the running counts"""
+        while self._recent_expiry and self._recent_expiry[0][0] < now:
+            _, error_type, severity = heapq.heappop(self._recent_expiry)
+            self._recent_type_counts[error_type] -= 1
+            if not self._recent_type_counts[error_type]:
+                del self._recent_type_counts[error_type]
+            self._recent_severity_counts[severity] -= 1
     
     def get_error_summary(self) -> Dict[str, Any]:
         """Get summary of detected errors"""
-        recent_errors = self.get_recent_errors(60)  # Last hour
+        self._expire_summary_counts(time.time())  # Last hour
         
-        summary = {
+        return {
             "total_errors": len(self.error_history),
-            "recent_errors": len(recent_errors),
-            "error_types": {},
-            "severity_counts": {severity.value: 0 for severity in ErrorSeverity}
+            "recent_errors": len(self._recent_expiry),
+            "error_types": dict(self._recent_type_counts),
+            "severity_counts": {
+                severity.label: self._recent_severity_counts[severity.label]
+                for severity in ErrorSeverity
+            }
         }
-        
-        for error in recent_errors:
-            # Count by type
-            if error.error_type not in summary["error_types"]:
-                summary["error_types"][error.error_type] = 0
-            summary["error_types"][error.error_type] += 1
-            
-            # Count by severity
-            summary["severity_counts"][error.severity.value] += 1
-        
-        return summary
     
-    def should_trigger_autofix(self, error: DetectedError) -> bool:
+    def should_trigger_autofix(self, error: DetectedError, now: Optional[float] = None) -> bool:
         """Determine if error should trigger auto-fix"""
-        # Critical errors always trigger auto-fix
-        if error.severity == ErrorSeverity.CRITICAL:
-            return True
-        
-        # High severity errors trigger auto-fix
-        if error.severity == ErrorSeverity.HIGH:
+        # High and critical errors always trigger auto-fix
+        if error.severity >= ErrorSeverity.HIGH:
             return True
         
         # Medium severity errors trigger auto-fix if repeated
         if error.severity == ErrorSeverity.MEDIUM:
-            recent_similar = [e for e in self.get_recent_errors(10) 
-                             if e.error_type == error.error_type]
-            return len(recent_similar) >= 3
-        
-        return False
\ No newline at end of file
+            cutoff_time = (time.time() if now is None else now) - 600
+            timestamps = self._recent_by_type[error.error_type]
+            while timestamps and timestamps[0] < cutoff_time:
+                timestamps.popleft()
+            # Counted rather than len() in case of out-of-order arrivals
+            return sum(1 for timestamp in timestamps if timestamp >= cutoff_time) >= 3
+        
+        return False
+
+# Detector used by analyze_logcat_batch worker processes, built on first chunk
+_worker_detector: Optional[ErrorDetector] = None
+
+def _gate_candidates(lines: List[str], app_package: str) -> List[str]:
+    """Lines holding the package name or a gate keyword, in order"""
+    joined = "\n".join(lines)
+    lowered = joined.lower()
+    if len(lowered) != len(joined) or joined.count("\n") != len(lines) - 1:
+        # Offsets in the lowered text wouldn't line up with the lines
+        return lines
+    
+    # Most lines hold none of the gate keywords, and finding those across
+    # the whole batch at once is cheaper than testing each line
+    starts = set()
+    for needle in (app_package,) + _GATE_KEYWORDS:
+        index = lowered.find(needle)
+        while index != -1:
+            starts.add(lowered.rfind("\n", 0, index) + 1)
+            end = lowered.find("\n", index)
+            if end == -1:
+                break
+            index = lowered.find(needle, end + 1)
+    
+    candidates = []
+    for start in sorted(starts):
+        end = joined.find("\n", start)
+        candidates.append(joined[start:end] if end != -1 else joined[start:])
+    return candidates
+
+def _analyze_logcat_chunk(lines: List[str], now: float,
+                          detector: Optional[ErrorDetector] = None) -> List[DetectedError]:
+    """Analyze a chunk of gated logcat lines, in a worker unless given a detector"""
+    global _worker_detector
+    if detector is None:
+        if _worker_detector is None:
+            _worker_detector = ErrorDetector()
+        detector = _worker_detector
+    
+    detected_errors = []
+    for line in lines:
+        detected_errors.extend(detector.analyze_logcat_line(line, now))
+    return detected_errors
@@ -6,20 +6,47 @@ Orchestrates error detection and auto-fixing
 
 import asyncio
 import logging
+import logging.handlers
+import queue
 import signal
 import sys
 import time
 import json
+import hashlib
 import os
-from typing import Dict, List, Optional, Any
+import re
+from collections import deque
+from typing import Dict, List, Optional, Any, Union
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
 
-from adb_manager import ADBManager
+from adb_manager import ADBManager, AsyncADBManager, DeviceInfo, ADB_BINARY
 from error_detector import ErrorDetector, DetectedError, ErrorSeverity
 from auto_fixer import AutoFixer, FixAction, FixResult
 
+try:
+    import orjson  # optional faster JSON, see requirements.txt
+except ImportError:
+    orjson = None
+
+# Terminal colour and cursor sequences some logcat formats emit
+_ANSI_ESCAPE = re.compile(rb"\x1b\[[0-9;]*[A-Za-z]")
+
+# Control bytes dropped from logcat output: all but tab and newline
+_CONTROL_BYTES = bytes(range(0, 9)) + bytes(range(11, 32)) + b"\x7f"
+
+def json_dumps(obj: Any) -> bytes:
+    """Compact JSON encoding, with orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """JSON decoding, with orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 @dataclass
 class MonitoringStats:
     """Statistics for monitoring session"""
@@ -31,6 +58,14 @@ class MonitoringStats:
     current_status: str
     last_error_time: Optional[float] = None
     last_fix_time: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields as a dict
+        
+        All fields are scalars, so a shallow copy gives what asdict()
+        does without its recursion and per-field deep copies.
+        """
+        return dict(self.__dict__)
 
 class AppMonitor:
     """Main monitoring daemon for Fire TV app"""
@@ -42,13 +77,22 @@ class AppMonitor:
         # Setup logging
         self._setup_logging()
         
-        # Initialize components
-        self.adb = ADBManager(
+        # Initialize components; the monitor's own probes run natively on
+        # the event loop, while the auto-fixer's blocking recovery steps use
+        # the shared synchronous manager from a worker thread
+        self.adb = AsyncADBManager(
             self.config["device_ip"], 
             self.config["device_port"]
         )
-        self.error_detector = ErrorDetector(self.config)
-        self.auto_fixer = AutoFixer(self.adb)
+        self.error_detector = ErrorDetector(self.config, history_size=500)
+        self.auto_fixer = AutoFixer(
+            ADBManager.get_instance(self.config["device_ip"], self.config["device_port"]),
+            history_size=200
+        )
+        
+        # Compressed dumps leave out containers the UI checks look for
+        self.adb.compressed_ui_dump = self.config["compressed_ui_dump"]
+        self.auto_fixer.adb.compressed_ui_dump = self.config["compressed_ui_dump"]
         
         # Monitoring state
         self.is_running = False
@@ -61,17 +105,26 @@ class AppMonitor:
             current_status="initializing"
         )
         
+        # Device properties don't change within a session, so the report
+        # reuses their dict form
+        self._device_info_dict: Optional[Dict[str, Any]] = None
+        
+        # Start times of fixes applied in the last hour, oldest first, for
+        # the max_fix_attempts_per_hour limit
+        self._recent_fix_times: deque = deque()
+        
+        # Digest of the last report written, see _generate_report
+        self._last_report_digest: Optional[bytes] = None
+        
         # Background tasks
         self.logcat_task = None
         self.health_check_task = None
         self.maintenance_task = None
         
-        # Logcat buffer
-        self.logcat_buffer = []
+        # Logcat buffer of (timestamp, line) tuples, which take a fraction
+        # of a dict's memory; the oldest line is dropped once full
         self.max_buffer_size = 1000
-        
-        # Thread pool for blocking operations
-        self.executor = ThreadPoolExecutor(max_workers=3)
+        self.logcat_buffer: deque = deque(maxlen=self.max_buffer_size)
         
     def _load_config(self) -> Dict[str, Any]:
         """Load monitoring configuration"""
@@ -85,6 +138,7 @@ class AppMonitor:
             "max_fix_attempts_per_hour": 10,
             "enable_auto_fix": True,
             "enable_emergency_recovery": True,
+            "compressed_ui_dump": False,
             "log_level": "INFO",
             "log_file": "monitor.log",
             "report_file": "monitor_report.json"
@@ -92,8 +146,8 @@ class AppMonitor:
         
         if os.path.exists(self.config_path):
             try:
-                with open(self.config_path, 'r') as f:
-                    config = json.load(f)
+                with open(self.config_path, 'rb') as f:
+                    config = json_loads(f.read())
                 # Merge with defaults
                 default_config.update(config)
             except Exception as e:
@@ -105,28 +159,58 @@ class AppMonitor:
         """Setup logging configuration"""
         log_level = getattr(logging, self.config["log_level"].upper(), logging.INFO)
         
-        # Configure logger
-        logging.basicConfig(
-            level=log_level,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.config["log_file"]),
-                logging.StreamHandler(sys.stdout)
-            ]
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler = logging.FileHandler(self.config["log_file"], delay=True)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        file_handler.setFormatter(formatter)
+        stream_handler.setFormatter(formatter)
+        
+        # Callers only queue the record; a listener thread does the file and
+        # terminal writes, so logging never blocks the event loop
+        log_queue = queue.SimpleQueue()
+        self._log_handler = logging.handlers.QueueHandler(log_queue)
+        # Formatted by the listener's handlers, so not here as well
+        self._log_handler.setFormatter(logging.Formatter('%(message)s'))
+        self._log_listener = logging.handlers.QueueListener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True
         )
         
+        # Configure logger
+        logging.basicConfig(level=log_level, handlers=[self._log_handler])
+        if self._log_handler in logging.getLogger().handlers:
+            self._log_listener.start()
+        
         self.logger = logging.getLogger(__name__)
         self.logger.info("Monitor logging initialized")
     
+    def _stop_log_listener(self):
+        """Write out queued records and log directly for the rest of shutdown"""
+        root = logging.getLogger()
+        if self._log_handler not in root.handlers:
+            return
+        
+        root.removeHandler(self._log_handler)
+        self._log_listener.stop()
+        for handler in self._log_listener.handlers:
+            root.addHandler(handler)
+    
     async def start(self):
         """Start the monitoring daemon"""
         self.logger.info("Starting Fire TV App Monitor")
         self.is_running = True
         self.stats.current_status = "starting"
         
-        # Setup signal handlers
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
+        # Setup signal handlers; run by the loop itself, so stop() is
+        # scheduled from loop context rather than from inside a signal frame
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self._on_signal, signum)
+            except NotImplementedError:
+                # Windows event loops have no add_signal_handler
+                signal.signal(signum, lambda signum, frame: loop.call_soon_threadsafe(
+                    self._on_signal, signum
+                ))
         
         try:
             # Initialize connection
@@ -169,28 +253,27 @@ class AppMonitor:
         if self.maintenance_task:
             self.maintenance_task.cancel()
     
-    def _signal_handler(self, signum, frame):
+    def _on_signal(self, signum: int):
         """Handle shutdown signals"""
         self.logger.info(f"Received signal {signum}, shutting down...")
         asyncio.create_task(self.stop())
     
     async def _initialize_connection(self) -> bool:
         """Initialize ADB connection to Fire TV"""
-        loop = asyncio.get_event_loop()
-        
         try:
             # Connect to device
-            connected = await loop.run_in_executor(self.executor, self.adb.connect)
+            connected = await self.adb.connect()
             if not connected:
                 return False
             
             # Get device info
-            device_info = await loop.run_in_executor(self.executor, self.adb.get_device_info)
+            device_info = await self.adb.get_device_info()
             if device_info:
                 self.logger.info(f"Connected to {device_info.model} (Android {device_info.android_version})")
+                self._cache_device_info(device_info)
             
             # Check app installation
-            app_installed = await loop.run_in_executor(self.executor, self.adb.is_app_installed)
+            app_installed = await self.adb.is_app_installed()
             if not app_installed:
                 self.logger.warning("Fire TV app not installed")
                 return False
@@ -201,58 +284,81 @@ class AppMonitor:
             self.logger.error(f"Connection initialization error: {e}")
             return False
     
+    def _cache_device_info(self, device_info: Optional[DeviceInfo]):
+        """Keep the report's device info once all its properties were read"""
+        if device_info is not None and device_info.api_level is not None:
+            self._device_info_dict = asdict(device_info)
+    
     async def _logcat_monitor(self):
         """Monitor logcat output for errors"""
         self.logger.info("Starting logcat monitoring")
         
         try:
+            # -T 1 starts from the newest entry, so a restart doesn't replay
+            # the device's whole log buffer; a -T timestamp would depend on
+            # the device clock agreeing with ours
             process = await asyncio.create_subprocess_exec(
-                "adb", "-s", self.adb.device_id, "logcat",
+                ADB_BINARY, "-s", self.adb.device_id, "logcat", "-T", "1",
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                close_fds=False
             )
             
-            while self.is_running:
-                try:
-                    line_bytes = await asyncio.wait_for(
-                        process.stdout.readline(), 
-                        timeout=1.0
-                    )
-                    
-                    if not line_bytes:
-                        break
-                    
-                    line = line_bytes.decode('utf-8', errors='ignore').strip()
-                    if line:
-                        await self._process_logcat_line(line)
+            # Read in large chunks and split them into lines here; a line cut
+            # off at the end of a chunk is carried over to the next one
+            trailer = b""
+            try:
+                while self.is_running:
+                    try:
+                        chunk = await process.stdout.read(65536)
+                        if not chunk:
+                            break
                         
-                except asyncio.TimeoutError:
-                    continue
-                except Exception as e:
-                    self.logger.error(f"Logcat processing error: {e}")
-                    await asyncio.sleep(1)
-            
-            process.terminate()
-            await process.wait()
-            
+                        raw_lines = (trailer + chunk).split(b"\n")
+                        trailer = raw_lines.pop()
+                        await self._process_logcat_lines(raw_lines)
+                        
+                    except Exception as e:
+                        self.logger.error(f"Logcat processing error: {e}")
+                        await asyncio.sleep(1)
+                
+                if trailer:
+                    await self._process_logcat_lines([trailer])
+            finally:
+                # Also reached when stop() cancels the task mid-read
+                if process.returncode is None:
+                    process.terminate()
+                await process.wait()
+            
+        except asyncio.CancelledError:
+            # Not an error: stop() cancels the task to end a blocked read
+            self.logger.info("Logcat monitoring stopped")
+            raise
         except Exception as e:
             self.logger.error(f"Logcat monitor error: {e}")
     
-    async def _process_logcat_line(self, line: str):
-        """Process a single logcat line"""
-        # Add to buffer
-        self.logcat_buffer.append({
-            "timestamp": time.time(),
-            "line": line
-        })
+    async def _process_logcat_lines(self, raw_lines: List[bytes]):
+        """Process a batch of raw logcat lines"""
+        # Normalized and decoded as one block rather than line by line;
+        # escape sequences go first since their ESC is a control byte
+        data = b"\n".join(raw_lines)
+        if b"\x1b" in data:
+            data = _ANSI_ESCAPE.sub(b"", data)
+        data = data.translate(None, _CONTROL_BYTES)
+        lines = [line.strip() for line in data.decode('utf-8', errors='ignore').split("\n")]
+        lines = [line for line in lines if line]
+        if not lines:
+            return
         
-        # Maintain buffer size
-        if len(self.logcat_buffer) > self.max_buffer_size:
-            self.logcat_buffer = self.logcat_buffer[-self.max_buffer_size:]
+        # Lines read together share one timestamp
+        now = time.time()
+        
+        # Add to buffer
+        self.logcat_buffer.extend((now, line) for line in lines)
         
         # Detect errors
         try:
-            errors = self.error_detector.analyze_logcat_line(line)
+            errors = self.error_detector.analyze_logcat_batch(lines, now)
             for error in errors:
                 await self._handle_detected_error(error)
         except Exception as e:
@@ -266,32 +372,39 @@ class AppMonitor:
         # Add to detector history
         self.error_detector.add_detected_error(error)
         
-        self.logger.warning(f"Detected {error.severity.value} error: {error.error_type}")
+        self.logger.warning(f"Detected {error.severity.label} error: {error.error_type}")
         
-        # Decide if auto-fix should be triggered
+        # Decide if auto-fix should be triggered; the error was detected
+        # just now, so its timestamp stands in for the current time
         if (self.config["enable_auto_fix"] and 
-            self.error_detector.should_trigger_autofix(error)):
+            self.error_detector.should_trigger_autofix(error, error.timestamp)):
             await self._attempt_auto_fix(error)
     
     async def _attempt_auto_fix(self, error: DetectedError):
         """Attempt to auto-fix an error"""
         # Check rate limiting
-        if not self._can_attempt_fix():
+        if not self._can_attempt_fix(error.timestamp):
             self.logger.info("Fix rate limit reached, skipping auto-fix")
             return
         
+        # Errors of a type still in cooldown are not fix attempts
+        if not self.auto_fixer.can_attempt_fix(error.error_type):
+            self.logger.debug(f"Fix for {error.error_type} is in cooldown")
+            return
+        
         self.stats.total_fixes_attempted += 1
         self.stats.last_fix_time = time.time()
         
         try:
             loop = asyncio.get_event_loop()
             fix_action = await loop.run_in_executor(
-                self.executor, 
+                None,
                 self.auto_fixer.apply_fix, 
                 error
             )
             
             if fix_action:
+                self._recent_fix_times.append(fix_action.timestamp)
                 if fix_action.result == FixResult.SUCCESS:
                     self.stats.successful_fixes += 1
                     self.logger.info(f"Successfully fixed {error.error_type}")
@@ -303,19 +416,17 @@ class AppMonitor:
             self.stats.failed_fixes += 1
             self.logger.error(f"Auto-fix exception: {e}")
     
-    def _can_attempt_fix(self) -> bool:
+    def _can_attempt_fix(self, now: Optional[float] = None) -> bool:
         """Check if we can attempt another fix (rate limiting)"""
         max_fixes = self.config["max_fix_attempts_per_hour"]
-        current_time = time.time()
+        current_time = time.time() if now is None else now
         one_hour_ago = current_time - 3600
         
-        # Count recent fixes
-        recent_fixes = [
-            action for action in self.auto_fixer.fix_history
-            if action.timestamp >= one_hour_ago
-        ]
+        # Expire fixes from the front; what remains is the last hour's
+        while self._recent_fix_times and self._recent_fix_times[0] < one_hour_ago:
+            self._recent_fix_times.popleft()
         
-        return len(recent_fixes) < max_fixes
+        return len(self._recent_fix_times) < max_fixes
     
     async def _health_check_loop(self):
         """Periodic health checks"""
@@ -331,36 +442,39 @@ class AppMonitor:
     
     async def _perform_health_check(self):
         """Perform comprehensive health check"""
-        loop = asyncio.get_event_loop()
-        
         try:
             # Check ADB connection
-            if not await loop.run_in_executor(self.executor, self.adb.is_connected):
+            if not await self.adb.is_connected():
                 self.logger.warning("ADB connection lost, attempting reconnection")
-                if not await loop.run_in_executor(self.executor, self.adb.connect):
+                if not await self.adb.connect():
                     self.logger.error("Failed to reconnect ADB")
                     return
             
-            # Check app state
-            app_running = await loop.run_in_executor(self.executor, self.adb.is_app_running)
-            current_activity = await loop.run_in_executor(self.executor, self.adb.get_current_activity)
+            # Errors from this check share one timestamp
+            now = time.time()
+            
+            # Process list, focus, meminfo and UI dump in one round-trip
+            snapshot = await self.adb.health_snapshot()
+            if snapshot is None:
+                self.logger.warning("Health snapshot failed, skipping checks")
+                return
             
             # Detect app state issues
-            app_errors = self.error_detector.analyze_app_state(app_running, current_activity)
+            app_errors = self.error_detector.analyze_app_state(
+                snapshot.app_running, snapshot.current_activity, now
+            )
             for error in app_errors:
                 await self._handle_detected_error(error)
             
             # Check memory usage
-            memory_info = await loop.run_in_executor(self.executor, self.adb.get_app_memory_usage)
-            if memory_info:
-                memory_errors = self.error_detector.analyze_memory_usage(memory_info)
+            if snapshot.memory_info:
+                memory_errors = self.error_detector.analyze_memory_usage(snapshot.memory_info, now)
                 for error in memory_errors:
                     await self._handle_detected_error(error)
             
             # Check UI state
-            ui_dump = await loop.run_in_executor(self.executor, self.adb.get_screen_dump)
-            if ui_dump:
-                ui_errors = self.error_detector.analyze_ui_dump(ui_dump)
+            if snapshot.ui_dump:
+                ui_errors = self.error_detector.analyze_ui_dump(snapshot.ui_dump, now)
                 for error in ui_errors:
                     await self._handle_detected_error(error)
             
@@ -388,90 +502,81 @@ class AppMonitor:
             
             # Run auto-fixer maintenance
             await loop.run_in_executor(
-                self.executor, 
+                None,
                 self.auto_fixer.schedule_maintenance
             )
             
             # Generate status report
             await self._generate_report()
             
-            # Clean up old log entries
-            await self._cleanup_logs()
-            
         except Exception as e:
             self.logger.error(f"Maintenance failed: {e}")
     
     async def _generate_report(self):
         """Generate monitoring report"""
         try:
-            report = {
-                "timestamp": datetime.now().isoformat(),
-                "uptime_seconds": time.time() - self.stats.start_time,
-                "statistics": asdict(self.stats),
+            if self._device_info_dict is None:
+                # Not read at startup; retried until the device answers
+                self._cache_device_info(await self.adb.get_device_info())
+            body = {
+                "statistics": self.stats.to_dict(),
                 "error_summary": self.error_detector.get_error_summary(),
                 "fix_statistics": self.auto_fixer.get_fix_statistics(),
-                "device_info": await asyncio.get_event_loop().run_in_executor(
-                    self.executor, self.adb.get_device_info
-                )
+                "device_info": self._device_info_dict
             }
+            body_json = json_dumps(body)
+            
+            # Timestamp and uptime always change, so only the body decides
+            # whether there is anything new to write
+            digest = hashlib.blake2b(body_json, digest_size=8).digest()
+            if digest == self._last_report_digest:
+                self.logger.debug("Monitoring report unchanged, not rewritten")
+                return
             
-            # Convert device_info to dict if it exists
-            if report["device_info"]:
-                report["device_info"] = asdict(report["device_info"])
+            report_json = json_dumps({
+                "timestamp": datetime.now().isoformat(),
+                "uptime_seconds": time.time() - self.stats.start_time,
+                **body
+            })
             
-            # Save report
-            with open(self.config["report_file"], 'w') as f:
-                json.dump(report, f, indent=2)
+            # Save report, replacing the old one only once fully written
+            report_file = self.config["report_file"]
+            with open(report_file + ".tmp", 'wb') as f:
+                f.write(report_json)
+            os.replace(report_file + ".tmp", report_file)
+            self._last_report_digest = digest
             
             self.logger.info(f"Generated monitoring report: {self.config['report_file']}")
             
         except Exception as e:
             self.logger.error(f"Report generation failed: {e}")
     
-    async def _cleanup_logs(self):
-        """Clean up old log entries"""
-        try:
-            # Clean error detector history (keep last 500)
-            if len(self.error_detector.error_history) > 500:
-                self.error_detector.error_history = self.error_detector.error_history[-500:]
-            
-            # Clean auto-fixer history (keep last 200)
-            if len(self.auto_fixer.fix_history) > 200:
-                self.auto_fixer.fix_history = self.auto_fixer.fix_history[-200:]
-            
-            # Clean logcat buffer
-            if len(self.logcat_buffer) > self.max_buffer_size:
-                self.logcat_buffer = self.logcat_buffer[-self.max_buffer_size:]
-            
-        except Exception as e:
-            self.logger.error(f"Log cleanup failed: {e}")
-    
     async def _cleanup(self):
         """Cleanup resources"""
         self.logger.info("Cleaning up monitor resources")
         
         try:
-            # Close executor
-            self.executor.shutdown(wait=True)
+            self.error_detector.close()
             
             # Generate final report
             await self._generate_report()
             
             # Disconnect ADB
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(self.executor, self.adb.disconnect)
+            await self.adb.disconnect()
             
             self.stats.current_status = "stopped"
             self.logger.info("Monitor cleanup complete")
             
         except Exception as e:
             self.logger.error(f"Cleanup error: {e}")
+        
+        self._stop_log_listener()
     
     def get_status(self) -> Dict[str, Any]:
         """Get current monitoring status"""
         return {
             "is_running": self.is_running,
-            "stats": asdict(self.stats),
+            "stats": self.stats.to_dict(),
             "uptime": time.time() - self.stats.start_time,
             "recent_errors": len(self.error_detector.get_recent_errors(5)),
             "config": self.config
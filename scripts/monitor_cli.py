@@ -9,14 +9,38 @@ import argparse
 import json
 import sys
 import os
-from typing import Dict, Any
+from collections import deque
+from typing import Dict, Any, List
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from monitor import AppMonitor
+from monitor import AppMonitor, json_loads
 from adb_manager import ADBManager
 
+# Logs above this size are tailed by reading blocks back from the end
+_TAIL_SEEK_THRESHOLD = 10 * 1024 * 1024
+
+def _tail_lines(path: str, count: int) -> List[str]:
+    """Last count lines of a text file without holding the whole file"""
+    if count <= 0:
+        return []
+    
+    if os.path.getsize(path) <= _TAIL_SEEK_THRESHOLD:
+        with open(path, 'r') as f:
+            return list(deque(f, maxlen=count))
+    
+    # Read 64 KB blocks backwards until the first wanted line is complete
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        data = b""
+        while end > 0 and data.count(b"\n") <= count:
+            start = max(end - 65536, 0)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    return [line.decode(errors="replace") for line in data.splitlines(keepends=True)[-count:]]
+
 class MonitorCLI:
     """Command line interface for monitoring system"""
     
@@ -35,10 +59,10 @@ class MonitorCLI:
         """Check current status of app and device"""
         try:
             # Load config
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
+            with open(self.config_path, 'rb') as f:
+                config = json_loads(f.read())
             
-            adb = ADBManager(config["device_ip"], config["device_port"])
+            adb = ADBManager.get_instance(config["device_ip"], config["device_port"])
             
             print("🔍 Fire TV App Status Check")
             print("=" * 40)
@@ -78,10 +102,12 @@ class MonitorCLI:
             if os.path.exists("monitor.log"):
                 print("📊 Monitor log found")
             
-            if os.path.exists("monitor_report.json"):
-                with open("monitor_report.json", 'r') as f:
-                    report = json.load(f)
-                    print(f"📈 Last report: {report.get('timestamp', 'Unknown')}")
+            try:
+                with open("monitor_report.json", 'rb') as f:
+                    report = json_loads(f.read())
+                print(f"📈 Last report: {report.get('timestamp', 'Unknown')}")
+            except FileNotFoundError:
+                pass
             
         except Exception as e:
             print(f"❌ Status check failed: {e}")
@@ -90,10 +116,10 @@ class MonitorCLI:
         """Test ADB connection to device"""
         try:
             # Load config
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
+            with open(self.config_path, 'rb') as f:
+                config = json_loads(f.read())
             
-            adb = ADBManager(config["device_ip"], config["device_port"])
+            adb = ADBManager.get_instance(config["device_ip"], config["device_port"])
             
             print("🔌 Testing ADB Connection")
             print("=" * 30)
@@ -136,32 +162,34 @@ class MonitorCLI:
     async def show_config(self, args):
         """Show current configuration"""
         try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
+            with open(self.config_path, 'rb') as f:
+                config = json_loads(f.read())
             
             print("⚙️  Monitor Configuration")
             print("=" * 30)
             print(json.dumps(config, indent=2))
             
+        except FileNotFoundError:
+            print(f"❌ Config file not found: {self.config_path}")
         except Exception as e:
             print(f"❌ Could not load config: {e}")
     
     async def show_logs(self, args):
         """Show recent log entries"""
         try:
-            if not os.path.exists("monitor.log"):
+            lines = args.lines
+            
+            try:
+                tail = _tail_lines("monitor.log", lines)
+            except FileNotFoundError:
                 print("❌ Monitor log file not found")
                 return
             
-            lines = args.lines if hasattr(args, 'lines') else 20
-            
             print(f"📝 Last {lines} log entries")
             print("=" * 40)
             
-            with open("monitor.log", 'r') as f:
-                log_lines = f.readlines()
-                for line in log_lines[-lines:]:
-                    print(line.rstrip())
+            for line in tail:
+                print(line.rstrip())
             
         except Exception as e:
             print(f"❌ Could not read logs: {e}")
@@ -169,14 +197,14 @@ class MonitorCLI:
     async def show_report(self, args):
         """Show monitoring report"""
         try:
-            if not os.path.exists("monitor_report.json"):
+            try:
+                with open("monitor_report.json", 'rb') as f:
+                    report = json_loads(f.read())
+            except FileNotFoundError:
                 print("❌ Monitor report not found")
                 print("💡 Run the monitor first to generate a report")
                 return
             
-            with open("monitor_report.json", 'r') as f:
-                report = json.load(f)
-            
             print("📊 Monitoring Report")
             print("=" * 25)
             